@@ -0,0 +1,109 @@
+"""Server-sent event fan-out of snapshot updates.
+
+One publish per new snapshot wakes every subscriber through a shared
+asyncio.Event, and each event body is encoded once per snapshot and
+projection no matter how many clients receive it. An idle subscriber costs
+one suspended coroutine, so a worker can hold thousands of them."""
+
+from typing import Callable, List, Optional, Tuple
+import asyncio
+import uuid
+
+import orjson
+
+
+def chart_diff(previous: List[dict], current: List[dict], key: str) -> Optional[dict]:
+    """Charts that are new or changed, keys that dropped out, and the new order; None if nothing changed"""
+    before = {chart.get(key): chart for chart in previous}
+    order = [chart.get(key) for chart in current]
+    upserted = [chart for chart in current if before.get(chart.get(key)) != chart]
+    removed = list(before.keys() - set(order))
+    if not upserted and not removed and order == [chart.get(key) for chart in previous]:
+        return None
+    return {"upserted": upserted, "removed": removed, "order": order}
+
+
+class SnapshotBroadcaster:
+    """Publishes numbered snapshots; a subscriber gets the full snapshot first
+    and then a diff per version, or a full snapshot again if it fell behind.
+
+    Versions only mean something inside one process, so event ids are
+    "<epoch>-<version>" with a random epoch per broadcaster; a Last-Event-ID
+    from another worker or an earlier run gets a full snapshot."""
+
+    def __init__(self, key: str, derive: Optional[Callable] = None, heartbeat: float = 15.0):
+        self.key = key  # identifies a chart across snapshots, e.g. pairAddress
+        self.derive = derive  # derive(snapshot, projection) -> projected snapshot
+        self.heartbeat = heartbeat
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self.current: Optional[List[dict]] = None
+        self.previous: Optional[List[dict]] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._messages = {}  # (kind, projection) -> encoded event for the current version
+
+    def publish(self, snapshot: List[dict]):
+        """Make snapshot the current version and wake subscribers; unchanged snapshots are dropped"""
+        if snapshot == self.current:
+            return
+        self.previous, self.current = self.current, snapshot
+        self.version += 1
+        self._messages = {}
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _view(self, snapshot: List[dict], projection: Optional[Tuple[str, ...]]) -> List[dict]:
+        return self.derive(snapshot, projection) if projection else snapshot
+
+    def message(self, kind: str, projection: Optional[Tuple[str, ...]] = None) -> bytes:
+        """The encoded SSE event for the current version, built once per kind and projection.
+        
+        Empty when the projected charts didn't change, e.g. slim views across a price update."""
+        cache_key = (kind, projection)
+        if cache_key not in self._messages:
+            current = self._view(self.current, projection)
+            if kind == "diff":
+                payload = chart_diff(self._view(self.previous, projection), current, self.key)
+            else:
+                payload = {"charts": current, "total": len(current)}
+            if payload is None:
+                self._messages[cache_key] = b""
+            else:
+                payload["version"] = self.version
+                self._messages[cache_key] = b"id: %s\nevent: %s\ndata: %s\n\n" % (
+                    self.event_id().encode(), kind.encode(), orjson.dumps(payload)
+                )
+        return self._messages[cache_key]
+
+    def event_id(self) -> str:
+        return f"{self.epoch}-{self.version}"
+
+    def last_version(self, last_event_id: Optional[str]) -> Optional[int]:
+        """The version a Last-Event-ID refers to, or None if this broadcaster didn't issue it"""
+        epoch, _, version = (last_event_id or "").partition("-")
+        if epoch != self.epoch or not version.isdigit() or int(version) > self.version:
+            return None
+        return int(version)
+
+    async def stream(self, projection: Optional[Tuple[str, ...]] = None, last_version: Optional[int] = None):
+        """Async generator of SSE bytes for one subscriber; last_version comes from last_version(Last-Event-ID)"""
+        self.subscribers += 1
+        try:
+            yield b"retry: 5000\n\n"
+            sent = last_version
+            while True:
+                changed = self._changed
+                if self.current is not None and sent != self.version:
+                    up_to_date_but_one = sent == self.version - 1 and self.previous is not None
+                    message = self.message("diff" if up_to_date_but_one else "snapshot", projection)
+                    if message:
+                        yield message
+                    sent = self.version
+                try:
+                    await asyncio.wait_for(changed.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Comment line so proxies don't drop idle connections
+                    yield b": keepalive\n\n"
+        finally:
+            self.subscribers -= 1
@@ -0,0 +1,354 @@
+"""OHLCV candles for the pairs in play.
+
+Each pair keeps one base resolution as parallel numpy columns; the higher
+intervals the chart selector offers are resampled from it with reduceat and
+cached until the next ingest. Candles come from a CandleSource: GeckoTerminal
+in production, or a deterministic synthetic series for local runs and benchmarks.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import hashlib
+import time
+
+import numpy as np
+
+from resilience import TokenBucket
+
+INTERVALS = {"15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400, "1w": 604800}
+# The epoch fell on a Thursday; weekly candles start on Monday like everywhere else
+WEEK_OFFSET = 4 * 86400
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+
+class CandleNotFound(LookupError):
+    """The provider doesn't know the pair"""
+
+
+def bucket_starts(times: np.ndarray, seconds: int) -> np.ndarray:
+    """Open time of the interval each timestamp falls into"""
+    offset = WEEK_OFFSET if seconds == INTERVALS["1w"] else 0
+    return (times - offset) // seconds * seconds + offset
+
+
+class CandleSeries:
+    """Candles of one pair at the base resolution, oldest first.
+
+    Prices are float32 (seven significant digits is plenty for a chart), volume
+    float64, open times int64 epoch seconds. At most max_bars are kept."""
+
+    def __init__(self, base_seconds: int, max_bars: int):
+        self.base_seconds = base_seconds
+        self.max_bars = max_bars
+        self.time = np.empty(0, dtype=np.int64)
+        self.columns = {name: np.empty(0, dtype=np.float32) for name in PRICE_COLUMNS}
+        self.columns["volume"] = np.empty(0, dtype=np.float64)
+        self.version = 0
+        self.updated_at: Optional[float] = None  # time.monotonic() of the last ingest
+        self._resampled = {}  # seconds -> {"time": ..., "open": ..., ...} for the current version
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return int(self.time[-1]) if len(self.time) else None
+
+    def ingest(self, rows) -> int:
+        """Merge (time, open, high, low, close, volume) rows in any order.
+
+        A row for a bar that is already stored replaces it, so re-fetching the
+        still-open bar updates it. Returns the number of bars stored."""
+        data = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+        self.updated_at = time.monotonic()
+        if not len(data):
+            return len(self)
+
+        times = np.concatenate((self.time, bucket_starts(data[:, 0].astype(np.int64), self.base_seconds)))
+        # Stable sort keeps stored bars ahead of incoming ones at the same time, so keeping
+        # the last row of every run lets incoming data win
+        order = np.argsort(times, kind="stable")
+        sorted_times = times[order]
+        keep = order[np.append(sorted_times[1:] != sorted_times[:-1], True)][-self.max_bars:]
+
+        self.time = times[keep]
+        for index, name in enumerate(PRICE_COLUMNS + ("volume",), start=1):
+            column = self.columns[name]
+            self.columns[name] = np.concatenate((column, data[:, index].astype(column.dtype)))[keep]
+        self.version += 1
+        self._resampled = {}
+        return len(self)
+
+    def resample(self, seconds: int) -> Dict[str, np.ndarray]:
+        """Columns at a coarser interval, computed once per interval and version"""
+        if seconds % self.base_seconds:
+            raise ValueError(f"{seconds}s candles can't be built from {self.base_seconds}s candles")
+        if seconds == self.base_seconds:
+            return {"time": self.time, **self.columns}
+        if seconds not in self._resampled:
+            self._resampled[seconds] = self._aggregate(seconds)
+        return self._resampled[seconds]
+
+    def _aggregate(self, seconds: int) -> Dict[str, np.ndarray]:
+        buckets = bucket_starts(self.time, seconds)
+        if not len(buckets):
+            return {"time": buckets, **{name: column[:0] for name, column in self.columns.items()}}
+        starts = np.flatnonzero(np.append(True, buckets[1:] != buckets[:-1]))
+        ends = np.append(starts[1:], len(buckets)) - 1
+        return {
+            "time": buckets[starts],
+            "open": self.columns["open"][starts],
+            "high": np.maximum.reduceat(self.columns["high"], starts),
+            "low": np.minimum.reduceat(self.columns["low"], starts),
+            "close": self.columns["close"][ends],
+            "volume": np.add.reduceat(self.columns["volume"], starts),
+        }
+
+    def window(self, seconds: int, limit: int) -> Dict[str, np.ndarray]:
+        """The latest limit candles at the given interval"""
+        return {name: column[-limit:] for name, column in self.resample(seconds).items()}
+
+
+class CandleStore:
+    """Series per pair, least recently used pairs evicted beyond max_pairs"""
+
+    def __init__(self, base_seconds: int, max_bars: int, max_pairs: int):
+        self.base_seconds = base_seconds
+        self.max_bars = max_bars
+        self.max_pairs = max_pairs
+        self._series: "OrderedDict[str, CandleSeries]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CandleSeries]:
+        series = self._series.get(key)
+        if series is not None:
+            self._series.move_to_end(key)
+        return series
+
+    def ingest(self, key: str, rows) -> CandleSeries:
+        series = self.get(key)
+        if series is None:
+            series = self._series[key] = CandleSeries(self.base_seconds, self.max_bars)
+            while len(self._series) > self.max_pairs:
+                self._series.popitem(last=False)
+        series.ingest(rows)
+        return series
+
+    def __len__(self):
+        return len(self._series)
+
+    def stats(self) -> dict:
+        return {
+            "pairs": len(self._series),
+            "bars": sum(len(series) for series in self._series.values()),
+            "base_seconds": self.base_seconds,
+            "max_bars": self.max_bars,
+            "max_pairs": self.max_pairs,
+        }
+
+
+class CandleSource:
+    """Interface for candle providers"""
+
+    async def fetch(self, chain_id: str, pair_address: str, base_seconds: int,
+                    since: Optional[int], limit: int) -> List[Tuple[float, ...]]:
+        """Up to limit (time, open, high, low, close, volume) rows at base_seconds,
+        only from since (inclusive) onwards when given; CandleNotFound for unknown pairs"""
+        raise NotImplementedError
+
+
+class SyntheticCandleSource(CandleSource):
+    """Deterministic candles derived from the pair address - no network, same data on every call.
+
+    Used for local development, benchmarks and tests in place of a real provider."""
+
+    async def fetch(self, chain_id, pair_address, base_seconds, since, limit):
+        seed = int(hashlib.sha1(f"{chain_id}:{pair_address}".encode()).hexdigest()[:8], 16)
+        last = int(time.time()) // base_seconds
+        first = last - limit + 1
+        if since is not None:
+            first = max(first, since // base_seconds)
+        bars = np.arange(first - 1, last + 1, dtype=np.float64)
+
+        phase = seed % 997
+        noise = np.modf(np.sin(bars * 12.9898 + phase) * 43758.5453)[0]
+        log_price = 0.08 * np.sin(bars / 41 + phase) + 0.03 * np.sin(bars / 7.3 + 2 * phase) + 0.01 * noise
+        closes = (1 + seed % 5000) / 1000 * np.exp(log_price)
+        opens, closes = closes[:-1], closes[1:]
+        spread = 1 + 0.004 * np.abs(noise[1:])
+        volume = (seed % 10 ** 6 + 10 ** 5) * (1.5 + noise[1:])
+
+        return np.column_stack((
+            bars[1:] * base_seconds, opens,
+            np.maximum(opens, closes) * spread, np.minimum(opens, closes) / spread,
+            closes, volume,
+        )).tolist()
+
+
+class GeckoTerminalCandleSource(CandleSource):
+    """Pool OHLCV from the GeckoTerminal public API, which serves at most 1000 candles
+    per call and about 30 calls a minute; longer histories are paged backwards."""
+
+    PAGE_SIZE = 1000
+    TIMEFRAMES = {
+        60: ("minute", 1), 300: ("minute", 5), 900: ("minute", 15),
+        3600: ("hour", 1), 14400: ("hour", 4), 86400: ("day", 1),
+    }
+    # Dexscreener chain ids that GeckoTerminal names differently
+    NETWORKS = {"ethereum": "eth", "polygon": "polygon_pos", "avalanche": "avax"}
+
+    def __init__(self, client, rate_limiter: TokenBucket):
+        self.client = client
+        self.rate_limiter = rate_limiter
+
+    async def fetch(self, chain_id, pair_address, base_seconds, since, limit):
+        if base_seconds not in self.TIMEFRAMES:
+            raise ValueError(f"GeckoTerminal has no {base_seconds}s candles")
+        timeframe, aggregate = self.TIMEFRAMES[base_seconds]
+        network = self.NETWORKS.get(chain_id, chain_id)
+
+        rows = []
+        before = None
+        while len(rows) < limit:
+            params = {"aggregate": aggregate, "limit": min(self.PAGE_SIZE, limit - len(rows)), "currency": "usd"}
+            if before is not None:
+                params["before_timestamp"] = before
+            await self.rate_limiter.acquire()
+            response = await self.client.get(f"/networks/{network}/pools/{pair_address}/ohlcv/{timeframe}", params=params)
+            if response.status_code == 404:
+                raise CandleNotFound(f"GeckoTerminal has no pool {pair_address} on {network}")
+            response.raise_for_status()
+            page = response.json().get("data", {}).get("attributes", {}).get("ohlcv_list") or []
+            # Newest first; stop once the page reaches what is already stored
+            page = [row for row in page if since is None or row[0] >= since]
+            rows.extend(page)
+            if len(page) < params["limit"]:
+                break
+            before = int(page[-1][0])
+        return rows
+
+
+class CandleIngestor:
+    """Keeps candles current for the pairs in play.
+
+    Every interval seconds the pairs returned by pairs_fn are topped up from the
+    source; a pair requested through the API is fetched on demand. Series
+    younger than max_age are served as they are, each fetch only asks for bars
+    from the last stored one on, and concurrent requests for the same pair share
+    one fetch. A failed fetch is remembered for failure_ttl seconds, during which
+    the pair is not fetched again and the same error is raised."""
+
+    MAX_FAILURES = 4096
+
+    def __init__(self, store: CandleStore, source: CandleSource, history_bars: int,
+                 pairs_fn: Callable[[], Iterable[Tuple[str, str]]], interval: float, max_age: float,
+                 failure_ttl: float):
+        self.store = store
+        self.source = source
+        self.history_bars = history_bars
+        self.pairs_fn = pairs_fn
+        self.interval = interval
+        self.max_age = max_age
+        self.failure_ttl = failure_ttl
+        self.fetches = 0
+        self.failed_fetches = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._failures: "OrderedDict[str, Tuple[Exception, float]]" = OrderedDict()  # key -> (error, expires_at)
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key(chain_id: str, pair_address: str) -> str:
+        return f"{chain_id}:{pair_address}"
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_fresh(self, series: Optional[CandleSeries]) -> bool:
+        return series is not None and series.updated_at is not None and \
+            time.monotonic() - series.updated_at < self.max_age
+
+    async def _fetch(self, chain_id: str, pair_address: str, key: str) -> CandleSeries:
+        try:
+            series = self.store.get(key)
+            since = series.last_time if series is not None else None
+            limit = self.history_bars
+            if since is not None:
+                # Only the bars since the last stored one (which may still have been open)
+                limit = min(limit, (int(time.time()) - since) // self.store.base_seconds + 1)
+            self.fetches += 1
+            rows = await self.source.fetch(chain_id, pair_address, self.store.base_seconds, since, limit)
+            series = self.store.ingest(key, rows)
+            self._failures.pop(key, None)
+            return series
+        except Exception as e:
+            self.failed_fetches += 1
+            self._failures[key] = (e, time.monotonic() + self.failure_ttl)
+            self._failures.move_to_end(key)
+            while len(self._failures) > self.MAX_FAILURES:
+                self._failures.popitem(last=False)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def recent_failure(self, key: str) -> Optional[Exception]:
+        """The error of the pair's last fetch if it failed less than failure_ttl ago"""
+        failure = self._failures.get(key)
+        if failure is None:
+            return None
+        error, expires_at = failure
+        if expires_at <= time.monotonic():
+            del self._failures[key]
+            return None
+        return error
+
+    async def ensure(self, chain_id: str, pair_address: str) -> CandleSeries:
+        """The pair's series, fetched or topped up first unless it was updated less than max_age ago.
+
+        While a recent fetch of the pair failed, the stored series is returned as
+        it is, or that fetch's error raised when there is none."""
+        key = self.key(chain_id, pair_address)
+        series = self.store.get(key)
+        if self.is_fresh(series):
+            return series
+        error = self.recent_failure(key)
+        if error is not None:
+            if series is not None:
+                return series
+            # A fresh traceback each time, or the remembered error's would keep growing
+            raise error.with_traceback(None)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._fetch(chain_id, pair_address, key))
+        return await asyncio.shield(task)
+
+    async def ingest_once(self):
+        for chain_id, pair_address in list(self.pairs_fn()):
+            try:
+                await self.ensure(chain_id, pair_address)
+            except Exception as e:
+                print(f"Failed to ingest candles for {chain_id}/{pair_address}: {e}")
+
+    async def _loop(self):
+        while True:
+            await self.ingest_once()
+            await asyncio.sleep(self.interval)
+
+    def status(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval": self.interval,
+            "fetches": self.fetches,
+            "failed_fetches": self.failed_fetches,
+            "failed_pairs": len(self._failures),
+            **self.store.stats(),
+        }
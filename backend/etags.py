@@ -0,0 +1,36 @@
+"""Weak ETags for conditional GETs.
+
+Tags are weak (W/"...") because the bodies they describe carry volatile
+fields such as snapshot_age; the tag identifies the data, not the bytes."""
+
+from typing import Optional, Tuple
+import hashlib
+
+import orjson
+
+
+def hash_etag(data: bytes) -> str:
+    return 'W/"%s"' % hashlib.sha1(data).hexdigest()[:24]
+
+
+def content_etag(payload) -> str:
+    """ETag of a JSON-serializable value"""
+    return hash_etag(orjson.dumps(payload, default=str))
+
+
+def projection_etag(etag: str, fields: Optional[Tuple[str, ...]]) -> str:
+    """ETag of a field projection, derived from the full value's tag without re-hashing the content"""
+    if not fields:
+        return etag
+    return hash_etag(f"{etag}|{','.join(fields)}".encode())
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Weak comparison of an If-None-Match header against etag"""
+    if not if_none_match or not etag:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    if "*" in tags:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in tags)
@@ -0,0 +1,60 @@
+"""Top market cap ticker list built from CoinGecko /coins/markets, with the
+stablecoins and wrapped tokens the ticker screen has no use for filtered out."""
+
+from typing import Iterable, List, Optional
+import re
+
+# What the frontend used to hard-code, as base symbols
+DEFAULT_EXCLUDED_SYMBOLS = (
+    "USDT", "USDC", "STETH", "WBTC", "WSTETH", "LEO", "WEETH", "WETH",
+    "USDS", "WBT", "BSC-USD", "CBBTC", "USDE", "BGB", "SUSDE",
+)
+
+
+class ExclusionRules:
+    """Decides which coins are left out of the top list.
+
+    symbols are exact base symbols, patterns are regexes matched against the
+    base symbol, and peg_tolerance (when set) drops anything trading within
+    that fraction of $1 - i.e. dollar stablecoins nobody listed by name yet."""
+
+    def __init__(self, symbols: Iterable[str] = DEFAULT_EXCLUDED_SYMBOLS, patterns: Iterable[str] = (),
+                 peg_tolerance: Optional[float] = None):
+        self.symbols = {symbol.strip().upper() for symbol in symbols if symbol.strip()}
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns if pattern.strip()]
+        self.peg_tolerance = peg_tolerance
+
+    def excludes(self, coin: dict) -> bool:
+        symbol = (coin.get("symbol") or "").upper()
+        if not symbol or symbol in self.symbols:
+            return True
+        if any(pattern.search(symbol) for pattern in self.patterns):
+            return True
+        if self.peg_tolerance is not None:
+            price = coin.get("current_price")
+            if price is not None and abs(price - 1) <= self.peg_tolerance:
+                return True
+        return False
+
+
+def top_coins(coins: List[dict], rules: ExclusionRules) -> List[dict]:
+    """Market-cap ordered coins that pass the rules, trimmed to what the API serves"""
+    ranked = []
+    seen = set()
+    for coin in coins:
+        if rules.excludes(coin):
+            continue
+        symbol = coin["symbol"].upper()
+        # Ticker symbols collide (several coins share one); keep the biggest
+        if symbol in seen:
+            continue
+        seen.add(symbol)
+        ranked.append({
+            "ticker": f"{symbol}USDT",
+            "symbol": symbol,
+            "name": coin.get("name"),
+            "market_cap": coin.get("market_cap"),
+            "market_cap_rank": coin.get("market_cap_rank"),
+            "current_price": coin.get("current_price"),
+        })
+    return ranked
@@ -0,0 +1,214 @@
+"""Storage for the trending metadata handed from the ticker screen to the analysis flow"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import json
+import time
+
+from etags import hash_etag, projection_etag
+from projection import project_charts
+
+
+class MetadataTooLarge(ValueError):
+    """Raised when a single entry is bigger than the whole store is allowed to be"""
+
+
+def encode_payload(charts: List[dict]) -> Tuple[int, str]:
+    """Size in bytes and ETag of the charts' JSON, from a single encoding pass"""
+    encoded = json.dumps(charts, default=str).encode()
+    return len(encoded), hash_etag(encoded)
+
+
+class MetadataStore:
+    """Interface for trending metadata backends"""
+
+    async def setup(self):
+        """Prepare the backend (indexes, files) once on startup"""
+
+    async def put(self, key: str, charts: List[dict], ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def lookup(self, key: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[Tuple[List[dict], str]]:
+        """(charts, etag) for the stored charts, or only the given dotted field paths of each chart"""
+        raise NotImplementedError
+
+    async def get(self, key: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[List[dict]]:
+        entry = await self.lookup(key, fields)
+        return entry[0] if entry else None
+
+    async def etag(self, key: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+        """ETag of an entry (and projection) without necessarily loading its charts"""
+        entry = await self.lookup(key, fields)
+        return entry[1] if entry else None
+
+    async def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class InMemoryMetadataStore(MetadataStore):
+    """Bounded LRU store with per-entry TTL, private to one worker process.
+
+    Entries are evicted when they expire, or least recently used first once
+    the store holds more than max_entries entries or max_bytes of JSON. Field
+    projections are kept with their entry (at most MAX_VIEWS each, oldest
+    dropped first) and count towards max_bytes like the charts themselves."""
+
+    MAX_VIEWS = 8
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> [charts, size including views, etag, expires_at, {fields: (projected charts, size)}]
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"expired": 0, "entries": 0, "bytes": 0}
+
+    def _remove(self, key: str):
+        _, size, _, _, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for key in [key for key, (_, _, _, expires_at, _) in self._entries.items() if expires_at <= now]:
+            self._remove(key)
+            self.evictions["expired"] += 1
+
+    def _evict(self):
+        """Evict least recently used entries until both caps hold again; the most recent one always stays"""
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions["entries"] += 1
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions["bytes"] += 1
+
+    def _view(self, entry: list, fields: Tuple[str, ...]) -> List[dict]:
+        """The entry's charts projected to fields, computed once and accounted in the entry's size"""
+        views = entry[4]
+        if fields not in views:
+            if len(views) >= self.MAX_VIEWS:
+                _, dropped_size = views.pop(next(iter(views)))
+                entry[1] -= dropped_size
+                self.total_bytes -= dropped_size
+            projected = project_charts(entry[0], fields)
+            size = encode_payload(projected)[0]
+            views[fields] = (projected, size)
+            entry[1] += size
+            self.total_bytes += size
+            self._evict()
+        return views[fields][0]
+
+    async def put(self, key: str, charts: List[dict], ttl: Optional[float] = None):
+        size, etag = encode_payload(charts)
+        if size > self.max_bytes:
+            raise MetadataTooLarge(f"Metadata is {size} bytes, the store holds at most {self.max_bytes}")
+
+        if key in self._entries:
+            self._remove(key)
+        self._purge_expired()
+
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        self._entries[key] = [charts, size, etag, time.monotonic() + ttl, {}]
+        self.total_bytes += size
+        self._evict()
+
+    async def lookup(self, key: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[Tuple[List[dict], str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        charts, _, etag, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.evictions["expired"] += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if fields:
+            return self._view(entry, fields), projection_etag(etag, fields)
+        return charts, etag
+
+    async def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": dict(self.evictions),
+        }
+
+
+class MongoMetadataStore(MetadataStore):
+    """Store shared by every worker, backed by a MongoDB collection with a TTL index.
+
+    MongoDB's TTL monitor only deletes expired documents about once a minute,
+    so reads also filter on expires_at."""
+
+    def __init__(self, collection, max_bytes: int, ttl: float):
+        self.collection = collection
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def setup(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def put(self, key: str, charts: List[dict], ttl: Optional[float] = None):
+        size, etag = encode_payload(charts)
+        if size > self.max_bytes:
+            raise MetadataTooLarge(f"Metadata is {size} bytes, the store holds at most {self.max_bytes}")
+
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        await self.collection.replace_one(
+            {"_id": key},
+            {"charts": charts, "size": size, "etag": etag, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+    async def lookup(self, key: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[Tuple[List[dict], str]]:
+        # The projection runs inside MongoDB, so only the requested fields cross the wire
+        projection = {f"charts.{path}": 1 for path in fields} if fields else {"charts": 1}
+        projection["etag"] = 1
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            projection,
+        )
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if doc.get("etag"):
+            etag = projection_etag(doc["etag"], fields)
+        else:
+            # Entry written before ETags were stored - hash what was returned
+            etag = encode_payload(doc["charts"])[1]
+        return doc["charts"], etag
+
+    async def etag(self, key: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"etag": 1},
+        )
+        if doc is None or not doc.get("etag"):
+            return None
+        return projection_etag(doc["etag"], fields)
+
+    async def stats(self) -> dict:
+        return {
+            "backend": "mongo",
+            "entries": await self.collection.estimated_document_count(),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
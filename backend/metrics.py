@@ -0,0 +1,105 @@
+"""Prometheus metrics for the API, the Dexscreener fan-out and MongoDB.
+
+Everything here is an in-process counter or histogram update, cheap enough to
+leave on in production. With several uvicorn workers, each worker reports
+only its own numbers.
+"""
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+disable_created_metrics()
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "API request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Dexscreener call latency",
+    ["endpoint"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+UPSTREAM_RESPONSES = Counter(
+    "upstream_responses_total", "Dexscreener calls by endpoint and HTTP status (or error kind)",
+    ["endpoint", "status"], registry=REGISTRY,
+)
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency",
+    ["command", "outcome"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit, stale, miss, fallback)",
+    ["cache", "result"], registry=REGISTRY,
+)
+
+TRENDING_SNAPSHOT_AGE = Gauge(
+    "trending_snapshot_age_seconds", "Age of the trending snapshot being served", registry=REGISTRY,
+)
+SYMBOL_INDEX_ENTRIES = Gauge(
+    "symbol_index_entries", "Entries in the symbol -> pair index", registry=REGISTRY,
+)
+TRENDING_STREAM_SUBSCRIBERS = Gauge(
+    "trending_stream_subscribers", "Open /api/trending-stream connections", registry=REGISTRY,
+)
+UPSTREAM_CIRCUIT_OPEN = Gauge(
+    "upstream_circuit_open", "1 while the Dexscreener circuit breaker is rejecting calls", registry=REGISTRY,
+)
+
+
+def upstream_endpoint(path: str) -> str:
+    """Collapse a Dexscreener path to a low-cardinality label"""
+    if path.startswith("/token-boosts"):
+        return "token-boosts"
+    if path.startswith("/tokens/"):
+        return "tokens"
+    if path.startswith("/latest/dex/search"):
+        return "search"
+    return "other"
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command the driver sends, via pymongo's command monitoring"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
+
+
+class StoreStatsCollector:
+    """Exposes the trending metadata store's own stats; refreshed right before each scrape"""
+
+    def __init__(self):
+        self.stats = {}
+
+    def collect(self):
+        stats = self.stats
+        if not stats:
+            return
+        backend = stats.get("backend", "unknown")
+        for name in ("entries", "bytes"):
+            if name in stats:
+                gauge = GaugeMetricFamily(f"trending_metadata_{name}", f"Trending metadata store {name}", labels=["backend"])
+                gauge.add_metric([backend], stats[name])
+                yield gauge
+        for name in ("hits", "misses"):
+            if name in stats:
+                counter = CounterMetricFamily(f"trending_metadata_{name}", f"Trending metadata store {name}", labels=["backend"])
+                counter.add_metric([backend], stats[name])
+                yield counter
+        if "evictions" in stats:
+            counter = CounterMetricFamily("trending_metadata_evictions", "Trending metadata evictions by reason", labels=["backend", "reason"])
+            for reason, count in stats["evictions"].items():
+                counter.add_metric([backend, reason], count)
+            yield counter
+
+
+store_stats_collector = StoreStatsCollector()
+REGISTRY.register(store_stats_collector)
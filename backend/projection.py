@@ -0,0 +1,52 @@
+"""Field projection for chart payloads, e.g. fields=baseToken.symbol,chainId"""
+
+from typing import List, Optional, Tuple
+import re
+
+# What the ticker screen actually reads from a chart
+SLIM_FIELDS = ("pairAddress", "chainId", "baseToken.symbol", "quoteToken.symbol")
+MAX_FIELDS = 32
+
+_FIELD_PATTERN = re.compile(r"^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$")
+
+
+def parse_fields(fields: Optional[str], slim: bool = False) -> Optional[Tuple[str, ...]]:
+    """Normalize the fields/slim query parameters into a hashable projection key.
+
+    Returns None when the full objects were asked for; raises ValueError for bad paths."""
+    if slim:
+        return SLIM_FIELDS
+    if not fields:
+        return None
+    paths = tuple(sorted({path.strip() for path in fields.split(",") if path.strip()}))
+    if not paths:
+        return None
+    if len(paths) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields can be requested")
+    for path in paths:
+        if not _FIELD_PATTERN.match(path):
+            raise ValueError(f"Invalid field path: {path}")
+    # baseToken already covers baseToken.symbol
+    return tuple(path for path in paths if not any(path.startswith(other + ".") for other in paths))
+
+
+def project(obj: dict, paths: Tuple[str, ...]) -> dict:
+    """Copy only the dotted paths out of obj; missing paths are skipped"""
+    result = {}
+    for path in paths:
+        keys = path.split(".")
+        value = obj
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = result
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+    return result
+
+
+def project_charts(charts: List[dict], paths: Tuple[str, ...]) -> List[dict]:
+    return [project(chart, paths) for chart in charts]
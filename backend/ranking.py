@@ -0,0 +1,171 @@
+"""Ranking of candidate pairs for the trending list.
+
+Each candidate is parsed once into numeric columns (Dexscreener sends most
+numbers as strings); filters and the weighted score then run as numpy array
+operations, so a refresh can rank thousands of candidates cheaply."""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# score component -> path of the value inside a Dexscreener pair
+SCORE_FIELDS = {
+    "volume": ("volume", "h24"),
+    "liquidity": ("liquidity", "usd"),
+    "fdv": ("fdv",),
+    "price_change": ("priceChange", "h24"),
+}
+
+
+def _number(pair: dict, path: Tuple[str, ...]) -> float:
+    value = pair
+    for key in path:
+        if not isinstance(value, dict):
+            return np.nan
+        value = value.get(key)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def pair_volume(pair: dict) -> float:
+    """24h volume of one pair, 0 when missing or unparseable"""
+    value = _number(pair, SCORE_FIELDS["volume"])
+    return 0.0 if np.isnan(value) else value
+
+
+class PairColumns:
+    """The numeric fields of a list of pairs as float64 arrays.
+
+    Each field is parsed on first use and kept, so a field no filter or weight
+    needs is never parsed at all."""
+
+    def __init__(self, pairs: List[dict], preferred_quotes: Iterable[str] = ()):
+        self.pairs = pairs
+        self.preferred_quotes = frozenset(preferred_quotes)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._preferred: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def column(self, name: str) -> np.ndarray:
+        """Values of one SCORE_FIELDS entry, missing or unparseable ones as 0 like the old `or 0` parsing"""
+        if name not in self._columns:
+            path = SCORE_FIELDS[name]
+            values = np.fromiter((_number(pair, path) for pair in self.pairs), dtype=np.float64, count=len(self.pairs))
+            self._columns[name] = np.nan_to_num(values, nan=0.0)
+        return self._columns[name]
+
+    @property
+    def preferred(self) -> np.ndarray:
+        """True for pairs quoted in one of the preferred quote tokens"""
+        if self._preferred is None:
+            quotes = self.preferred_quotes
+            self._preferred = np.fromiter(
+                (((pair.get("quoteToken") or {}).get("symbol") or "").upper() in quotes for pair in self.pairs),
+                dtype=bool, count=len(self.pairs),
+            )
+        return self._preferred
+
+
+class RankingPolicy:
+    """Filters and weights that decide which pairs make the trending list.
+
+    The score is a weighted sum of volume, liquidity and FDV (log-scaled to
+    [0, 1] across the candidates) and 24h price change (scaled to [-1, 1]).
+    With a single weight the order is that field's, e.g. plain 24h volume."""
+
+    def __init__(self, weights: Dict[str, float], min_volume: float = 0.0, min_liquidity: float = 0.0,
+                 max_fdv: Optional[float] = None, preferred_quotes: Iterable[str] = ("USDT", "USDC")):
+        unknown = set(weights) - set(SCORE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown ranking weights: {', '.join(sorted(unknown))}")
+        self.weights = {name: weight for name, weight in weights.items() if weight}
+        self.min_volume = min_volume
+        self.min_liquidity = min_liquidity
+        self.max_fdv = max_fdv
+        self.preferred_quotes = tuple(quote.upper() for quote in preferred_quotes)
+
+    def columns(self, pairs: List[dict]) -> PairColumns:
+        return PairColumns(pairs, self.preferred_quotes)
+
+    def mask(self, columns: PairColumns) -> np.ndarray:
+        """Candidates that pass every filter"""
+        keep = np.ones(len(columns), dtype=bool)
+        if self.min_volume:
+            keep &= columns.column("volume") > self.min_volume
+        if self.min_liquidity:
+            keep &= columns.column("liquidity") >= self.min_liquidity
+        if self.max_fdv:
+            keep &= columns.column("fdv") <= self.max_fdv
+        return keep
+
+    def score(self, columns: PairColumns) -> np.ndarray:
+        if len(self.weights) == 1:
+            # Scaling can't change a single field's order; the raw values also keep
+            # apart large volumes that log scaling would round to the same score
+            (name, weight), = self.weights.items()
+            return weight * columns.column(name)
+        score = np.zeros(len(columns))
+        for name, weight in self.weights.items():
+            values = columns.column(name)
+            if name == "price_change":
+                scale = np.abs(values).max(initial=0.0)
+            else:
+                values = np.log1p(np.maximum(values, 0.0))
+                scale = values.max(initial=0.0)
+            if scale > 0:
+                score += weight * values / scale
+        return score
+
+    def best_pair(self, pairs: List[dict]) -> Optional[dict]:
+        """Highest 24h volume pair, preferring the preferred quotes when there are any"""
+        if not pairs:
+            return None
+        columns = self.columns(pairs)
+        volume = columns.column("volume")
+        if columns.preferred.any():
+            volume = np.where(columns.preferred, volume, -np.inf)
+        return pairs[int(np.argmax(volume))]
+
+    def best_per_key(self, pairs: List[dict], keys: List[str]) -> Dict[str, dict]:
+        """Highest 24h volume pair per key (e.g. base token address); the first one wins ties"""
+        if not pairs:
+            return {}
+        unique_keys, codes = np.unique(np.asarray(keys, dtype=object).astype(str), return_inverse=True)
+        volume = self.columns(pairs).column("volume")
+        # Sorted by key, then volume, then earliest position - the last row of each key is its best pair
+        order = np.lexsort((-np.arange(len(pairs)), volume, codes))
+        last = order[np.append(codes[order][1:] != codes[order][:-1], True)]
+        return {str(unique_keys[codes[index]]): pairs[index] for index in last}
+
+    def rank(self, pairs: List[dict], limit: int) -> List[dict]:
+        """Distinct pairs (first occurrence of each pairAddress) that pass the filters, best score first"""
+        seen = set()
+        candidates = []
+        for pair in pairs:
+            address = pair.get("pairAddress")
+            if address and address not in seen:
+                seen.add(address)
+                candidates.append(pair)
+        if not candidates:
+            return []
+
+        columns = self.columns(candidates)
+        indices = np.flatnonzero(self.mask(columns))
+        score = self.score(columns)[indices]
+        # Stable, so equal scores keep candidate order like the sort it replaces
+        top = indices[np.argsort(-score, kind="stable")[:limit]]
+        return [candidates[index] for index in top]
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "volume=1,liquidity=0.5" into {"volume": 1.0, "liquidity": 0.5}"""
+    weights = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, _, weight = item.partition("=")
+            weights[name.strip()] = float(weight)
+    return weights
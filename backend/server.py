@@ -1,23 +1,111 @@
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel
-import requests
+from brotli_asgi import BrotliMiddleware
+from contextlib import asynccontextmanager
+import httpx
 import os
 from typing import List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import asyncio
+from collections import OrderedDict
 from datetime import datetime
+import csv
+import hashlib
+import hmac
+import io
+import json
+import random
+import re
+import time
 import uuid
 
-app = FastAPI(title="Charts Demo API")
+from broadcast import SnapshotBroadcaster
+from candles import (
+    INTERVALS, CandleIngestor, CandleNotFound, CandleStore, GeckoTerminalCandleSource, SyntheticCandleSource,
+)
+from etags import content_etag, etag_matches, hash_etag, projection_etag
+from market_cap import DEFAULT_EXCLUDED_SYMBOLS, ExclusionRules, top_coins
+from projection import SLIM_FIELDS, parse_fields, project_charts
+from ranking import RankingPolicy, pair_volume, parse_weights
+import metrics
+from resilience import CircuitBreaker, CircuitOpenError, TokenBucket
+from metadata_store import InMemoryMetadataStore, MetadataStore, MetadataTooLarge, MongoMetadataStore
+from tournament import DoubleEliminationTournament, TournamentError
+from warm_start import WarmStartStore
+from write_buffer import BufferFull, WriteBuffer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared upstream resources on startup and release them on shutdown.
+    
+    Nothing here waits on MongoDB: indexes, the metadata store, the warm-start
+    restore and the session summary backfill run in the background and failures are only logged, so the API comes
+    up even while the database is unreachable."""
+    setup_tasks = [
+        asyncio.create_task(ensure_indexes()),
+        asyncio.create_task(setup_trending_metadata_store()),
+        asyncio.create_task(start_trending()),
+        asyncio.create_task(backfill_session_summaries()),
+    ]
+    if MARKET_CAP_REFRESH_INTERVAL > 0:
+        market_cap_refresher.start()
+    if CANDLE_REFRESH_INTERVAL > 0:
+        candle_ingestor.start()
+    if CHOICE_BUFFER_ENABLED:
+        choice_buffer.start()
+    yield
+    for task in setup_tasks:
+        task.cancel()
+    await trending_refresher.stop()
+    await market_cap_refresher.stop()
+    await candle_ingestor.stop()
+    if WARM_START_ENABLED:
+        await save_symbol_pairs()
+    await choice_buffer.stop()
+    await http_client.aclose()
+    await coingecko_client.aclose()
+    await geckoterminal_client.aclose()
+
+# orjson for every response; the large chart payloads below return ORJSONResponse directly,
+# which also skips FastAPI's jsonable_encoder pass
+app = FastAPI(title="Charts Demo API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Add security middleware  
 # Note: HTTPS redirect should be handled at infrastructure level in production
 # app.add_middleware(HTTPSRedirectMiddleware)  # Commented out - causing POST issues
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
+# Brotli (or gzip for clients without br) for responses above the size threshold.
+# Added before the http middleware below so it wraps the endpoint response directly.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+# The event stream is excluded: compressors buffer output, which would hold back pushed events.
+app.add_middleware(
+    BrotliMiddleware, quality=4, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True,
+    excluded_handlers=["^/api/trending-stream$"],
+)
+
+# Request metrics middleware - labelled by route template to keep cardinality bounded
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.REQUEST_LATENCY.labels(
+            request.method, route.path if route else "unmatched", str(status)
+        ).observe(time.perf_counter() - started)
+
 # Security headers middleware
 @app.middleware("http")
 async def add_security_headers(request, call_next):
@@ -38,13 +126,187 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for trending metadata (in production, use Redis/database)
-trending_metadata_cache = {}
-
 # MongoDB connection
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/chartsdemo')
-client = AsyncIOMotorClient(MONGO_URL)
-db = client.chartsdemo
+DB_NAME = os.environ.get('DB_NAME', 'chartsdemo')
+# Fail fast while the server is unreachable instead of pymongo's default 30s wait per operation
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    event_listeners=[metrics.MongoCommandListener()],
+)
+db = client[DB_NAME]
+
+# Indexes created on startup. The (session_id, chart_index) index also serves plain
+# session_id lookups through its prefix, so there is no separate session_id index.
+DB_INDEXES = {
+    "choices": [
+        IndexModel([("session_id", ASCENDING), ("chart_index", ASCENDING)], name="session_chart"),
+        IndexModel([("timestamp", ASCENDING)], name="timestamp"),
+    ],
+    "pair_stats": [
+        IndexModel([(field, DESCENDING)], name=field) for field in ("green_count", "total_votes", "tournament_wins", "last_voted")
+    ],
+    "symbol_pairs": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at", expireAfterSeconds=0),
+    ],
+}
+# Admin endpoints are closed until ADMIN_TOKEN is set, then need it in the X-Admin-Token header
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def require_admin_token(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    if not token or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+async def ensure_collection_indexes(collection_name: str, indexes: List[IndexModel]):
+    try:
+        await db[collection_name].create_indexes(indexes)
+    except Exception as e:
+        print(f"Failed to create indexes on {collection_name}: {e}")
+
+async def ensure_indexes():
+    """Create any missing indexes on every collection concurrently; existing ones are left untouched"""
+    await asyncio.gather(*(
+        ensure_collection_indexes(collection_name, indexes) for collection_name, indexes in DB_INDEXES.items()
+    ))
+
+# Trending metadata storage. "memory" is a bounded LRU private to each worker; "mongo" is
+# shared by all workers, which is required when running more than one uvicorn worker.
+TRENDING_METADATA_BACKEND = os.environ.get('TRENDING_METADATA_BACKEND', 'memory')
+TRENDING_METADATA_MAX_ENTRIES = int(os.environ.get('TRENDING_METADATA_MAX_ENTRIES', '256'))
+TRENDING_METADATA_MAX_BYTES = int(os.environ.get('TRENDING_METADATA_MAX_BYTES', str(64 * 1024 * 1024)))
+TRENDING_METADATA_TTL = float(os.environ.get('TRENDING_METADATA_TTL', '3600'))
+# A /metrics scrape waits at most this long for the store's stats, then reports the last ones
+TRENDING_METADATA_STATS_TIMEOUT = float(os.environ.get('TRENDING_METADATA_STATS_TIMEOUT', '1'))
+
+def create_metadata_store(backend: str) -> MetadataStore:
+    if backend == 'memory':
+        return InMemoryMetadataStore(TRENDING_METADATA_MAX_ENTRIES, TRENDING_METADATA_MAX_BYTES, TRENDING_METADATA_TTL)
+    if backend == 'mongo':
+        # A single Mongo document is capped at 16MB
+        return MongoMetadataStore(db.trending_metadata, min(TRENDING_METADATA_MAX_BYTES, 15 * 1024 * 1024), TRENDING_METADATA_TTL)
+    raise ValueError(f"Unknown TRENDING_METADATA_BACKEND: {backend}")
+
+trending_metadata_store = create_metadata_store(TRENDING_METADATA_BACKEND)
+
+async def setup_trending_metadata_store():
+    try:
+        await trending_metadata_store.setup()
+    except Exception as e:
+        print(f"Failed to set up the trending metadata store: {e}")
+
+# Choice ingestion. With the buffer enabled, votes are acknowledged once queued and
+# written with insert_many every CHOICE_BUFFER_INTERVAL seconds or CHOICE_BUFFER_SIZE votes.
+CHOICE_BUFFER_ENABLED = os.environ.get('CHOICE_BUFFER_ENABLED', 'false').lower() == 'true'
+CHOICE_BUFFER_SIZE = int(os.environ.get('CHOICE_BUFFER_SIZE', '200'))
+CHOICE_BUFFER_INTERVAL = float(os.environ.get('CHOICE_BUFFER_INTERVAL', '1.0'))
+# Votes waiting beyond this are refused with a 503; a batch that fails this many flushes in a row is dropped
+CHOICE_BUFFER_MAX_PENDING = int(os.environ.get('CHOICE_BUFFER_MAX_PENDING', '20000'))
+CHOICE_BUFFER_MAX_ATTEMPTS = int(os.environ.get('CHOICE_BUFFER_MAX_ATTEMPTS', '30'))
+MAX_CHOICE_BATCH = 500
+MAX_RESULTS_PAGE = 500
+KNOWN_SNAPSHOTS_MAX = 10000
+EXPORT_BATCH_SIZE = 500
+LEADERBOARD_SORTS = ("green_count", "total_votes", "tournament_wins", "last_voted")
+MAX_LEADERBOARD = 200
+
+# Dexscreener upstream client - one pooled connection set shared by every request
+DEXSCREENER_URL = os.environ.get('DEXSCREENER_URL', "https://api.dexscreener.com")
+UPSTREAM_CONCURRENCY = int(os.environ.get('UPSTREAM_CONCURRENCY', '10'))
+UPSTREAM_TIMEOUT = float(os.environ.get('UPSTREAM_TIMEOUT', '5'))
+DEXSCREENER_TOKENS_BATCH = 30  # max addresses per /tokens/v1 lookup
+TRENDING_DEADLINE = float(os.environ.get('TRENDING_DEADLINE', '12'))
+TRENDING_CACHE_TTL = float(os.environ.get('TRENDING_CACHE_TTL', '60'))
+TRENDING_STALE_TTL = float(os.environ.get('TRENDING_STALE_TTL', '300'))
+TRENDING_SIZE = 32
+# Trending ranking: candidates below the floors (or above the FDV cap, 0 = none) are dropped, the
+# rest ordered by a weighted score of volume, liquidity, fdv and price_change (24h). Searched
+# symbols also need more than SEARCH_MIN_VOLUME; boosted tokens only face the RANKING_ floors.
+SEARCH_MIN_VOLUME = float(os.environ.get('SEARCH_MIN_VOLUME', '10000'))
+RANKING_MIN_VOLUME = float(os.environ.get('RANKING_MIN_VOLUME', '0'))
+RANKING_MIN_LIQUIDITY = float(os.environ.get('RANKING_MIN_LIQUIDITY', '0'))
+RANKING_MAX_FDV = float(os.environ.get('RANKING_MAX_FDV', '0'))
+RANKING_WEIGHTS = os.environ.get('RANKING_WEIGHTS', 'volume=1')
+RANKING_PREFERRED_QUOTES = os.environ.get('RANKING_PREFERRED_QUOTES', 'USDT,USDC')
+SYMBOL_INDEX_TTL = float(os.environ.get('SYMBOL_INDEX_TTL', '600'))
+SYMBOL_INDEX_MISS_TTL = float(os.environ.get('SYMBOL_INDEX_MISS_TTL', '60'))
+SYMBOL_INDEX_MAX_ENTRIES = int(os.environ.get('SYMBOL_INDEX_MAX_ENTRIES', '4096'))
+# Every unresolved ticker costs one search call against the shared Dexscreener quota;
+# 32 is the number of ticker slots the screen offers
+MAX_RESOLVE_TICKERS = 32
+TICKER_PATTERN = re.compile(r"^[A-Z0-9]{1,20}$")
+TRENDING_REFRESH_INTERVAL = float(os.environ.get('TRENDING_REFRESH_INTERVAL', '45'))  # 0 disables the background refresher
+TRENDING_REFRESH_JITTER = float(os.environ.get('TRENDING_REFRESH_JITTER', '0.1'))
+TRENDING_REFRESH_MAX_BACKOFF = float(os.environ.get('TRENDING_REFRESH_MAX_BACKOFF', '600'))
+# Persist the trending snapshot and symbol resolutions so a restarted process starts warm;
+# snapshots older than WARM_START_MAX_AGE are not worth serving and are ignored
+WARM_START_ENABLED = os.environ.get('WARM_START_ENABLED', 'true').lower() == 'true'
+WARM_START_MAX_AGE = float(os.environ.get('WARM_START_MAX_AGE', '3600'))
+
+# CoinGecko top market cap list, fetched on a schedule and served from memory. The free API
+# allows a few calls per minute per IP, so browsers no longer call it themselves.
+COINGECKO_URL = os.environ.get('COINGECKO_URL', "https://api.coingecko.com/api/v3")
+MARKET_CAP_FETCH_SIZE = int(os.environ.get('MARKET_CAP_FETCH_SIZE', '100'))  # coins fetched before filtering, max 250
+MARKET_CAP_CACHE_TTL = float(os.environ.get('MARKET_CAP_CACHE_TTL', '300'))
+MARKET_CAP_STALE_TTL = float(os.environ.get('MARKET_CAP_STALE_TTL', '3600'))
+MARKET_CAP_REFRESH_INTERVAL = float(os.environ.get('MARKET_CAP_REFRESH_INTERVAL', '300'))  # 0 disables the background refresher
+# Exclusion rules: comma separated base symbols and symbol regexes, plus an optional
+# peg tolerance that drops anything priced within that fraction of $1
+MARKET_CAP_EXCLUDED_SYMBOLS = os.environ.get('MARKET_CAP_EXCLUDED_SYMBOLS', ",".join(DEFAULT_EXCLUDED_SYMBOLS))
+MARKET_CAP_EXCLUDED_PATTERNS = os.environ.get('MARKET_CAP_EXCLUDED_PATTERNS', '')
+MARKET_CAP_PEG_TOLERANCE = os.environ.get('MARKET_CAP_PEG_TOLERANCE')
+MAX_MARKET_CAP = 100
+
+# OHLCV candles for the pairs in play. "geckoterminal" fetches pool candles from the
+# GeckoTerminal API; "synthetic" generates deterministic candles locally (dev, bench, tests).
+CANDLE_SOURCE = os.environ.get('CANDLE_SOURCE', 'geckoterminal')
+CANDLE_BASE_INTERVAL = os.environ.get('CANDLE_BASE_INTERVAL', '15m')  # stored resolution, the others are resampled
+CANDLE_HISTORY_BARS = int(os.environ.get('CANDLE_HISTORY_BARS', '2880'))  # 30 days of 15m bars
+CANDLE_MAX_PAIRS = int(os.environ.get('CANDLE_MAX_PAIRS', '256'))
+CANDLE_MAX_AGE = float(os.environ.get('CANDLE_MAX_AGE', '300'))
+CANDLE_REFRESH_INTERVAL = float(os.environ.get('CANDLE_REFRESH_INTERVAL', '300'))  # 0 disables background ingestion
+CANDLE_FAILURE_TTL = float(os.environ.get('CANDLE_FAILURE_TTL', '300'))  # a pair whose fetch failed isn't retried for this long
+GECKOTERMINAL_URL = os.environ.get('GECKOTERMINAL_URL', "https://api.geckoterminal.com/api/v2")
+GECKOTERMINAL_RATE_LIMIT = float(os.environ.get('GECKOTERMINAL_RATE_LIMIT', '0.5'))  # ~30 calls/min on the public API
+MAX_CANDLES = 1000
+CANDLE_PATH_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,100}$")
+
+http_client = httpx.AsyncClient(
+    base_url=DEXSCREENER_URL,
+    timeout=UPSTREAM_TIMEOUT,
+    limits=httpx.Limits(max_connections=UPSTREAM_CONCURRENCY, max_keepalive_connections=UPSTREAM_CONCURRENCY),
+)
+upstream_semaphore = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+coingecko_client = httpx.AsyncClient(base_url=COINGECKO_URL, timeout=UPSTREAM_TIMEOUT)
+geckoterminal_client = httpx.AsyncClient(
+    base_url=GECKOTERMINAL_URL, timeout=UPSTREAM_TIMEOUT, headers={"Accept": "application/json"}
+)
+
+# Stay inside Dexscreener's quota (300 requests/min on search) and stop calling it while it's failing.
+# Rate limits are for the whole deployment; every worker process has its own buckets, so each one
+# gets an equal share of WEB_CONCURRENCY (the worker count uvicorn and gunicorn read).
+WEB_CONCURRENCY = max(1, int(os.environ.get('WEB_CONCURRENCY', '1')))
+DEXSCREENER_RATE_LIMIT = float(os.environ.get('DEXSCREENER_RATE_LIMIT', '5'))
+DEXSCREENER_RATE_BURST = float(os.environ.get('DEXSCREENER_RATE_BURST', '10'))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_TIMEOUT = float(os.environ.get('BREAKER_RESET_TIMEOUT', '30'))
+
+def worker_rate_limiter(rate: float, burst: float) -> TokenBucket:
+    """This worker's share of a deployment-wide rate limit"""
+    return TokenBucket(rate / WEB_CONCURRENCY, max(1.0, burst / WEB_CONCURRENCY))
+
+upstream_rate_limiter = worker_rate_limiter(DEXSCREENER_RATE_LIMIT, DEXSCREENER_RATE_BURST)
+upstream_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+
+# Tokens that are actually trending based on recent market activity
+TRENDING_SEARCHES = [
+    "ALT", "PUMP", "IPO", "POWELL", "MAGA", "MOODENG", "GOAT", "SPX", 
+    "PNUT", "FRED", "CHILLGUY", "ZEREBRO", "VIRTUAL", "TURBO", "ACT",
+    "WIF", "POPCAT", "BONK", "PEPE", "SHIB", "DOGE", "FLOKI", "MEME"
+]
 
 # Pydantic models
 class ChartChoice(BaseModel):
@@ -54,6 +316,16 @@ class ChartChoice(BaseModel):
     choice: str  # "green" or "red"
     timestamp: datetime
 
+class ChartChoiceBatch(BaseModel):
+    choices: List[ChartChoice]
+
+class TournamentResult(BaseModel):
+    winner_id: str
+    version: Optional[int] = None  # optimistic concurrency; a stale version gets a 409
+
+class TickerResolveRequest(BaseModel):
+    tickers: List[str]
+
 class SessionResult(BaseModel):
     session_id: str
     total_charts: int
@@ -61,6 +333,13 @@ class SessionResult(BaseModel):
     red_count: int
     choices: List[dict]
 
+def conditional_response(payload: Optional[dict], etag: str, if_none_match: Optional[str]) -> Response:
+    """304 with no body when the client already holds this version, the JSON payload otherwise"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(payload, headers=headers)
+
 @app.get("/")
 async def root():
     return {"message": "Charts Demo API is running"}
@@ -75,118 +354,476 @@ async def store_trending_metadata(metadata: dict):
         raise HTTPException(status_code=400, detail="Missing session_id or charts data")
     
     try:
-        trending_metadata_cache[session_id] = charts_data
+        await trending_metadata_store.put(session_id, charts_data)
         return {"success": True, "message": f"Stored metadata for {len(charts_data)} charts"}
+    except MetadataTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to store metadata: {str(e)}")
 
 @app.get("/api/get-trending-metadata/{session_id}")
-async def get_trending_metadata(session_id: str):
-    """Retrieve stored trending charts metadata"""
-    if session_id not in trending_metadata_cache:
-        raise HTTPException(status_code=404, detail="No trending metadata found for this session")
+async def get_trending_metadata(session_id: str, fields: Optional[str] = None, slim: bool = False,
+                                if_none_match: Optional[str] = Header(None)):
+    """Retrieve stored trending charts metadata, optionally projected like trending-charts.
     
+    Answers If-None-Match with 304 from the stored ETag, without loading the charts."""
     try:
-        return {
-            "success": True,
-            "charts": trending_metadata_cache[session_id]
-        }
+        projection = parse_fields(fields, slim)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        if if_none_match:
+            etag = await trending_metadata_store.etag(session_id, projection)
+            if etag_matches(if_none_match, etag):
+                return conditional_response(None, etag, if_none_match)
+        entry = await trending_metadata_store.lookup(session_id, projection)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get metadata: {str(e)}")
+    
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No trending metadata found for this session")
+    
+    charts, etag = entry
+    return conditional_response({
+        "success": True,
+        "charts": charts
+    }, etag, if_none_match)
 
-@app.get("/api/trending-charts")
-async def get_trending_charts():
-    """Fetch top 32 trending charts from multiple sources"""
+@app.get("/api/trending-metadata-stats")
+async def get_trending_metadata_stats():
+    """Report trending metadata store size, hit rate and evictions"""
     try:
-        all_pairs = []
-        
-        # Method 1: Get boosted tokens (these are currently trending/promoted)
+        return await trending_metadata_store.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get trending metadata stats: {str(e)}")
+
+async def fetch_dexscreener(path: str, timeout: float = UPSTREAM_TIMEOUT, params: Optional[dict] = None):
+    """GET a Dexscreener endpoint through the shared pool.
+    
+    Calls are rate limited to the upstream quota and bounded by the upstream
+    semaphore; while the circuit breaker is open they fail immediately."""
+    endpoint = metrics.upstream_endpoint(path)
+    if upstream_breaker.is_open:
+        metrics.UPSTREAM_RESPONSES.labels(endpoint, "circuit_open").inc()
+        raise CircuitOpenError("Upstream circuit is open")
+    await upstream_rate_limiter.acquire()
+    try:
+        upstream_breaker.before_call()
+    except CircuitOpenError:
+        metrics.UPSTREAM_RESPONSES.labels(endpoint, "circuit_open").inc()
+        raise
+    
+    async with upstream_semaphore:
+        started = time.perf_counter()
         try:
-            url = "https://api.dexscreener.com/token-boosts/latest/v1"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            boosted_data = response.json()
-            if boosted_data and len(boosted_data) > 0:
-                # Convert boosted tokens to pairs by searching for each
-                for boost in boosted_data[:20]:  # Take top 20 boosted
-                    try:
-                        token_addr = boost.get('tokenAddress')
-                        chain_id = boost.get('chainId')
-                        if token_addr and chain_id:
-                            # Search for pairs using token address
-                            search_url = f"https://api.dexscreener.com/latest/dex/search?q={token_addr}"
-                            search_response = requests.get(search_url, timeout=5)
-                            search_response.raise_for_status()
-                            
-                            search_data = search_response.json()
-                            pairs = search_data.get('pairs', [])
-                            
-                            if pairs:
-                                # Take the highest volume pair for this token
-                                best_pair = max(pairs, key=lambda x: float(x.get('volume', {}).get('h24', 0) or 0))
-                                all_pairs.append(best_pair)
-                                
-                    except Exception as token_error:
-                        print(f"Failed to fetch pair for boosted token {boost.get('tokenAddress', 'unknown')}: {token_error}")
-                        continue
-                        
-        except Exception as boost_error:
-            print(f"Failed to get boosted tokens: {boost_error}")
-        
-        # Method 2: Search for currently popular tokens 
-        # These are tokens that are actually trending based on recent market activity
-        trending_searches = [
-            "ALT", "PUMP", "IPO", "POWELL", "MAGA", "MOODENG", "GOAT", "SPX", 
-            "PNUT", "FRED", "CHILLGUY", "ZEREBRO", "VIRTUAL", "TURBO", "ACT",
-            "WIF", "POPCAT", "BONK", "PEPE", "SHIB", "DOGE", "FLOKI", "MEME"
-        ]
-        
-        for token in trending_searches:
+            response = await http_client.get(path, params=params, timeout=timeout)
+        except httpx.TimeoutException:
+            metrics.UPSTREAM_RESPONSES.labels(endpoint, "timeout").inc()
+            upstream_breaker.record_failure()
+            raise
+        except httpx.HTTPError:
+            metrics.UPSTREAM_RESPONSES.labels(endpoint, "error").inc()
+            upstream_breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            upstream_breaker.abandon()
+            raise
+        finally:
+            metrics.UPSTREAM_LATENCY.labels(endpoint).observe(time.perf_counter() - started)
+        metrics.UPSTREAM_RESPONSES.labels(endpoint, str(response.status_code)).inc()
+        # Throttling and server errors count against the upstream, anything else means it's answering
+        if response.status_code == 429 or response.status_code >= 500:
+            upstream_breaker.record_failure()
+        else:
+            upstream_breaker.record_success()
+        response.raise_for_status()
+        return response.json()
+
+trending_ranking = RankingPolicy(
+    parse_weights(RANKING_WEIGHTS),
+    min_volume=RANKING_MIN_VOLUME,
+    min_liquidity=RANKING_MIN_LIQUIDITY,
+    max_fdv=RANKING_MAX_FDV or None,
+    preferred_quotes=[quote.strip() for quote in RANKING_PREFERRED_QUOTES.split(",") if quote.strip()],
+)
+
+def token_address(pair: dict) -> str:
+    """Lowercased base token address of a pair, '' when missing"""
+    return ((pair.get('baseToken') or {}).get('address') or '').lower()
+
+async def fetch_token_pairs(chain_id: str, token_addresses: List[str]) -> dict:
+    """Resolve up to DEXSCREENER_TOKENS_BATCH tokens on one chain in a single call.
+    
+    Returns {lowercased token address: highest volume pair}."""
+    try:
+        pairs = await fetch_dexscreener(f"/tokens/v1/{chain_id}/{','.join(token_addresses)}") or []
+        return trending_ranking.best_per_key(pairs, [token_address(pair) for pair in pairs])
+    except Exception as batch_error:
+        print(f"Failed to fetch pairs for {len(token_addresses)} boosted tokens on {chain_id}: {batch_error}")
+    return {}
+
+async def resolve_boosted_tokens(boosts: List[dict]) -> List[dict]:
+    """Resolve boosted tokens to their highest volume pairs, batched per chainId"""
+    tokens_by_chain = {}
+    for boost in boosts:
+        token_addr = boost.get('tokenAddress')
+        chain_id = boost.get('chainId')
+        if token_addr and chain_id and token_addr not in tokens_by_chain.setdefault(chain_id, []):
+            tokens_by_chain[chain_id].append(token_addr)
+    
+    batches = [
+        (chain_id, addresses[i:i + DEXSCREENER_TOKENS_BATCH])
+        for chain_id, addresses in tokens_by_chain.items()
+        for i in range(0, len(addresses), DEXSCREENER_TOKENS_BATCH)
+    ]
+    results = await asyncio.gather(*(fetch_token_pairs(chain_id, batch) for chain_id, batch in batches))
+    resolved = {}
+    for best_pairs in results:
+        resolved.update(best_pairs)
+    
+    # Keep boost order so the dedupe below favours the most promoted tokens
+    return [
+        resolved[boost['tokenAddress'].lower()]
+        for boost in boosts
+        if boost.get('tokenAddress') and boost['tokenAddress'].lower() in resolved
+    ]
+
+async def search_best_pair(symbol: str) -> Optional[dict]:
+    """Search Dexscreener for a symbol and return its best pair; upstream errors propagate"""
+    data = await fetch_dexscreener("/latest/dex/search", params={"q": symbol})
+    return trending_ranking.best_pair(data.get('pairs') or [])
+
+async def fetch_search_pair(token: str) -> Optional[dict]:
+    """Find the best USDT/USDC pair for a trending symbol, if it trades more than SEARCH_MIN_VOLUME"""
+    try:
+        best_pair = await search_best_pair(token)
+        if best_pair is not None and pair_volume(best_pair) > SEARCH_MIN_VOLUME:
+            return best_pair
+    except Exception as search_error:
+        print(f"Failed to search for {token}: {search_error}")
+    return None
+
+async def build_trending_charts() -> List[dict]:
+    """Resolve boosted tokens in per-chain batches, search the trending symbols
+    concurrently, and return the top TRENDING_SIZE pairs by ranking score"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + TRENDING_DEADLINE
+    
+    # Method 1: Get boosted tokens (these are currently trending/promoted)
+    boosted_pairs = []
+    try:
+        boosted_data = await fetch_dexscreener("/token-boosts/latest/v1", timeout=10)
+        if boosted_data:
+            remaining = max(deadline - loop.time(), 0)
+            boosted_pairs = await asyncio.wait_for(resolve_boosted_tokens(boosted_data[:20]), remaining)  # Take top 20 boosted
+    except asyncio.TimeoutError:
+        print("Trending deadline reached while resolving boosted tokens")
+    except Exception as boost_error:
+        print(f"Failed to get boosted tokens: {boost_error}")
+    
+    # Method 2: Search for currently popular tokens. Every symbol is searched - boosted
+    # tokens often reuse a popular ticker without being the token it stands for.
+    tasks = [asyncio.create_task(fetch_search_pair(token)) for token in TRENDING_SEARCHES]
+    
+    # Wait for the searches, but never past the overall deadline
+    done, pending = set(), set()
+    if tasks:
+        remaining = max(deadline - loop.time(), 0)
+        done, pending = await asyncio.wait(tasks, timeout=remaining)
+    for task in pending:
+        task.cancel()
+    if pending:
+        print(f"Trending deadline reached, dropped {len(pending)} slow upstream lookups")
+    
+    # A token the boosted phase already resolved keeps its boosted pair
+    boosted_tokens = {token_address(pair) for pair in boosted_pairs} - {''}
+    searched_pairs = [task.result() for task in tasks if task in done and task.result() is not None]
+    all_pairs = boosted_pairs + [pair for pair in searched_pairs if token_address(pair) not in boosted_tokens]
+    
+    # A round cut short by the breaker is partial - keep serving the last good snapshot instead
+    if upstream_breaker.state == CircuitBreaker.OPEN:
+        raise CircuitOpenError(f"Upstream circuit opened during the trending build ({len(all_pairs)} pairs collected)")
+    
+    # Dedupe by pairAddress (boosted first), filter and score in one vectorized pass
+    return trending_ranking.rank(all_pairs, TRENDING_SIZE)
+
+class SnapshotCache:
+    """Process-wide TTL cache for one computed value, with stale-while-revalidate
+    and single-flight refreshes so concurrent misses share one computation"""
+    
+    MAX_VIEWS = 16
+    
+    def __init__(self, name: str, compute, ttl: float, stale_ttl: float, derive=None, eager_views=(), on_update=None):
+        self.name = name
+        self.compute = compute
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.derive = derive  # derive(value, key) -> view of a snapshot, e.g. a field projection
+        self.eager_views = eager_views  # view keys built as soon as a snapshot lands
+        self.on_update = on_update  # async on_update(value), run as a background task for each new snapshot
+        self.value = None
+        self.views = {}
+        self.updated_at = None  # time.monotonic() of the last successful compute
+        self.etag: Optional[str] = None  # content hash of the current snapshot
+        self._inflight: Optional[asyncio.Task] = None
+        self._update_task: Optional[asyncio.Task] = None
+    
+    def view(self, key):
+        """A derived view of the current snapshot, computed at most once per snapshot"""
+        if key not in self.views:
+            if len(self.views) >= self.MAX_VIEWS:
+                self.views.pop(next(k for k in self.views if k not in self.eager_views))
+            self.views[key] = self.derive(self.value, key)
+        return self.views[key]
+    
+    def view_etag(self, key=None) -> Optional[str]:
+        """ETag of the current snapshot or one of its views"""
+        return projection_etag(self.etag, key) if self.etag else None
+    
+    def age(self) -> Optional[float]:
+        if self.updated_at is None:
+            return None
+        return time.monotonic() - self.updated_at
+    
+    def refresh(self) -> asyncio.Task:
+        """Start a recompute unless one is already running, and return the shared task"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._run())
+        return self._inflight
+    
+    def restore(self, value, age: float) -> bool:
+        """Install a previously saved snapshot that is already age seconds old,
+        unless a newer one was computed meanwhile; returns whether it was installed"""
+        if self.updated_at is not None and self.age() <= age:
+            return False
+        self.value = value
+        self.views = {key: self.derive(value, key) for key in self.eager_views}
+        self.etag = content_etag(value)
+        self.updated_at = time.monotonic() - age
+        return True
+    
+    async def _run(self):
+        value = await self.compute()
+        # Empty results are never cached so a failed upstream round is retried next time
+        if value:
+            views = {key: self.derive(value, key) for key in self.eager_views}
+            etag = content_etag(value)
+            self.value, self.views, self.etag = value, views, etag
+            self.updated_at = time.monotonic()
+            if self.on_update is not None:
+                self._update_task = asyncio.create_task(self.on_update(value))
+        return value
+    
+    def _revalidated(self, task: asyncio.Task):
+        """Done-callback of a background revalidation: nothing awaits it, so its failure is reported here"""
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Revalidating {self.name} snapshot failed, serving the last good one: {task.exception()}")
+    
+    async def get(self):
+        """Return (value, age_seconds), recomputing only when the cached value is unusable"""
+        age = self.age()
+        if age is not None and age < self.ttl:
+            metrics.CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return self.value, age
+        if age is not None and age < self.ttl + self.stale_ttl:
+            # Serve stale data right away and revalidate in the background
+            metrics.CACHE_REQUESTS.labels(self.name, "stale").inc()
+            if self._inflight is None or self._inflight.done():
+                self.refresh().add_done_callback(self._revalidated)
+            return self.value, age
+        metrics.CACHE_REQUESTS.labels(self.name, "miss").inc()
+        try:
+            # Shield so a disconnecting client doesn't cancel the computation other requests wait on
+            value = await asyncio.shield(self.refresh())
+        except Exception as e:
+            if self.value is None:
+                raise
+            value = None
+            print(f"Refreshing {self.name} snapshot failed, serving the last good one: {e}")
+        if not value and self.value:
+            # Upstream incident - the last good snapshot beats an error, however old it is
+            metrics.CACHE_REQUESTS.labels(self.name, "fallback").inc()
+            return self.value, self.age()
+        return value, self.age() or 0.0
+
+warm_start_store = WarmStartStore(db.warm_start, db.symbol_pairs)
+warm_start_status = {"snapshot_age": None, "symbol_pairs": 0}
+
+async def save_symbol_pairs():
+    """Write symbol resolutions made since the last save"""
+    entries = symbol_index.drain_dirty()
+    try:
+        await warm_start_store.save_symbol_pairs(entries)
+    except Exception as e:
+        symbol_index.mark_dirty(symbol for symbol, _, _ in entries)
+        print(f"Failed to save symbol pairs: {e}")
+
+async def save_warm_start(charts: List[dict]):
+    """Persist a fresh trending snapshot together with the resolutions behind it"""
+    try:
+        await warm_start_store.save_snapshot("trending", charts)
+    except Exception as e:
+        print(f"Failed to save trending snapshot: {e}")
+    await save_symbol_pairs()
+
+async def restore_warm_start():
+    """Load the saved snapshot and resolutions; a cold start is the fallback, not an error.
+    
+    Runs in the background, so anything computed in the meantime is newer and wins."""
+    try:
+        for symbol, pair, ttl in await warm_start_store.load_symbol_pairs():
+            symbol_index.restore(symbol, pair, ttl)
+        warm_start_status["symbol_pairs"] = len(symbol_index)
+        saved = await warm_start_store.load_snapshot("trending", WARM_START_MAX_AGE)
+        if saved is not None:
+            charts, age = saved
+            if trending_cache.restore(charts, age):
+                trending_broadcaster.publish(charts)
+                warm_start_status["snapshot_age"] = round(age, 1)
+    except Exception as e:
+        print(f"Failed to restore warm-start state: {e}")
+
+async def start_trending():
+    """Restore the warm start, then start the refresher so it sees the restored snapshot's age"""
+    if WARM_START_ENABLED:
+        await restore_warm_start()
+    if TRENDING_REFRESH_INTERVAL > 0:
+        trending_refresher.start()
+
+# Push channel for /api/trending-stream, fed by the same refresh that fills the cache
+TRENDING_STREAM_HEARTBEAT = float(os.environ.get('TRENDING_STREAM_HEARTBEAT', '15'))
+trending_broadcaster = SnapshotBroadcaster("pairAddress", derive=project_charts, heartbeat=TRENDING_STREAM_HEARTBEAT)
+
+async def on_trending_update(charts: List[dict]):
+    """Push a new snapshot to stream subscribers, then persist it"""
+    trending_broadcaster.publish(charts)
+    if WARM_START_ENABLED:
+        await save_warm_start(charts)
+
+trending_cache = SnapshotCache(
+    "trending", build_trending_charts, TRENDING_CACHE_TTL, TRENDING_STALE_TTL,
+    derive=project_charts, eager_views=(SLIM_FIELDS,), on_update=on_trending_update,
+)
+
+class BackgroundRefresher:
+    """Keeps a SnapshotCache warm on a fixed cadence, off the request path.
+    
+    Every run is jittered so workers don't hit the upstream in lockstep, and
+    consecutive failures back off exponentially up to max_backoff."""
+    
+    def __init__(self, cache: SnapshotCache, interval: float, jitter: float, max_backoff: float):
+        self.cache = cache
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.last_success: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+        self.next_run_in: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._loop())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
             try:
-                search_url = f"https://api.dexscreener.com/latest/dex/search?q={token}"
-                response = requests.get(search_url, timeout=5)
-                response.raise_for_status()
-                
-                data = response.json()
-                pairs = data.get('pairs', [])
-                
-                if pairs:
-                    # Filter for USDT/USDC pairs with good volume
-                    usdt_pairs = [p for p in pairs if p.get('quoteToken', {}).get('symbol', '').upper() in ['USDT', 'USDC']]
-                    target_pairs = usdt_pairs if usdt_pairs else pairs
-                    
-                    # Take the best pair (highest 24h volume)
-                    best_pair = max(target_pairs, key=lambda x: float(x.get('volume', {}).get('h24', 0) or 0))
-                    
-                    # Only add if it has significant volume (>$10k)
-                    volume_24h = float(best_pair.get('volume', {}).get('h24', 0) or 0)
-                    if volume_24h > 10000:
-                        all_pairs.append(best_pair)
-                        
-            except Exception as search_error:
-                print(f"Failed to search for {token}: {search_error}")
-                continue
-        
-        # Remove duplicates based on pair address
-        seen_addresses = set()
-        unique_pairs = []
-        for pair in all_pairs:
-            pair_addr = pair.get('pairAddress')
-            if pair_addr and pair_addr not in seen_addresses:
-                seen_addresses.add(pair_addr)
-                unique_pairs.append(pair)
-        
-        # Sort by 24h volume (highest first) and take top 32
-        unique_pairs.sort(key=lambda x: float(x.get('volume', {}).get('h24', 0) or 0), reverse=True)
-        top_trending = unique_pairs[:32]
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def refresh_once(self) -> bool:
+        started = time.monotonic()
+        try:
+            value = await self.cache.refresh()
+            if not value:
+                raise RuntimeError("upstream returned nothing")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.consecutive_failures += 1
+            self.last_error = str(e)
+            print(f"Refreshing {self.cache.name} failed ({self.consecutive_failures} in a row): {e}")
+            return False
+        self.last_duration = time.monotonic() - started
+        self.last_success = datetime.utcnow()
+        self.last_error = None
+        self.consecutive_failures = 0
+        return True
+    
+    def next_delay(self) -> float:
+        delay = self.interval
+        if self.consecutive_failures:
+            delay = min(self.interval * 2 ** self.consecutive_failures, self.max_backoff)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+    
+    async def _loop(self):
+        # A restored snapshot younger than one interval doesn't need refreshing yet
+        age = self.cache.age()
+        if age is not None and age < self.interval:
+            self.next_run_in = self.interval - age
+            await asyncio.sleep(self.next_run_in)
+        while True:
+            await self.refresh_once()
+            self.next_run_in = self.next_delay()
+            await asyncio.sleep(self.next_run_in)
+    
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "last_success": self.last_success,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+            "consecutive_failures": self.consecutive_failures,
+            "next_run_in": round(self.next_run_in, 1) if self.next_run_in is not None else None,
+        }
+
+trending_refresher = BackgroundRefresher(
+    trending_cache, TRENDING_REFRESH_INTERVAL, TRENDING_REFRESH_JITTER, TRENDING_REFRESH_MAX_BACKOFF
+)
+
+@app.get("/api/trending-charts")
+async def get_trending_charts(fields: Optional[str] = None, slim: bool = False, if_none_match: Optional[str] = Header(None)):
+    """Fetch top 32 trending charts from multiple sources.
+    
+    fields=a,b.c returns only those (dotted) paths of each chart; slim=true returns
+    just what the ticker screen needs. Projections and ETags are built once per snapshot."""
+    try:
+        projection = parse_fields(fields, slim)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        if trending_refresher.running and trending_cache.value is not None:
+            # Precomputed snapshot - a plain read, the refresher does the upstream work
+            metrics.CACHE_REQUESTS.labels("trending", "hit").inc()
+            top_trending, snapshot_age = trending_cache.value, trending_cache.age()
+        else:
+            # Cold start (joins the refresher's first run) or refresher disabled
+            top_trending, snapshot_age = await trending_cache.get()
         
         if top_trending:
-            return {
+            etag = trending_cache.view_etag(projection)
+            if etag_matches(if_none_match, etag):
+                return conditional_response(None, etag, if_none_match)
+            if projection:
+                top_trending = trending_cache.view(projection)
+            return conditional_response({
                 "success": True,
                 "charts": top_trending,
-                "total": len(top_trending)
-            }
+                "total": len(top_trending),
+                "snapshot_age": round(snapshot_age, 1)
+            }, etag, if_none_match)
         
         # Final fallback: Return empty if nothing works
         raise HTTPException(status_code=500, detail="Could not fetch trending charts")
@@ -194,53 +831,896 @@ async def get_trending_charts():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch trending charts: {str(e)}")
 
+@app.get("/api/trending-stream")
+async def stream_trending_charts(fields: Optional[str] = None, slim: bool = False, last_event_id: Optional[str] = Header(None)):
+    """Server-sent events with the trending charts: a snapshot event on connect, then a diff
+    event (upserted charts, removed pairAddresses, new order) whenever the pool changes.
+    
+    Reconnecting clients send Last-Event-ID and only get what they missed, or a fresh
+    snapshot when the id came from another worker or process. Accepts the
+    same fields/slim projections as /api/trending-charts."""
+    try:
+        projection = parse_fields(fields, slim)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Checked against the setting, not the task: the refresher starts only after the warm-start restore
+    if TRENDING_REFRESH_INTERVAL <= 0:
+        raise HTTPException(status_code=503, detail="Trending stream requires the background refresher")
+    
+    return StreamingResponse(
+        trending_broadcaster.stream(projection, trending_broadcaster.last_version(last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/trending-status")
+async def get_trending_status():
+    """Report the background trending refresher state and snapshot freshness"""
+    snapshot_age = trending_cache.age()
+    return {
+        "refresher": trending_refresher.status(),
+        "upstream": upstream_breaker.status(),
+        "warm_start": warm_start_status if WARM_START_ENABLED else None,
+        "stream": {"event_id": trending_broadcaster.event_id(), "subscribers": trending_broadcaster.subscribers},
+        "snapshot_age": round(snapshot_age, 1) if snapshot_age is not None else None,
+        "total": len(trending_cache.value or [])
+    }
+
+market_cap_rules = ExclusionRules(
+    symbols=MARKET_CAP_EXCLUDED_SYMBOLS.split(","),
+    patterns=MARKET_CAP_EXCLUDED_PATTERNS.split(","),
+    peg_tolerance=float(MARKET_CAP_PEG_TOLERANCE) if MARKET_CAP_PEG_TOLERANCE else None,
+)
+
+async def build_market_cap_list() -> List[dict]:
+    """Fetch CoinGecko's market cap ranking and apply the exclusion rules"""
+    response = await coingecko_client.get("/coins/markets", params={
+        "vs_currency": "usd",
+        "order": "market_cap_desc",
+        "per_page": MARKET_CAP_FETCH_SIZE,
+        "page": 1,
+        "sparkline": "false",
+    })
+    response.raise_for_status()
+    return top_coins(response.json(), market_cap_rules)
+
+market_cap_cache = SnapshotCache("market_cap", build_market_cap_list, MARKET_CAP_CACHE_TTL, MARKET_CAP_STALE_TTL)
+market_cap_refresher = BackgroundRefresher(
+    market_cap_cache, MARKET_CAP_REFRESH_INTERVAL, TRENDING_REFRESH_JITTER, TRENDING_REFRESH_MAX_BACKOFF
+)
+
+@app.get("/api/top-market-cap")
+async def get_top_market_cap(limit: int = 32):
+    """Top coins by market cap as USDT tickers, stablecoins and wrapped tokens excluded"""
+    if not 0 < limit <= MAX_MARKET_CAP:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_MARKET_CAP}")
+    
+    try:
+        if market_cap_refresher.running and market_cap_cache.value is not None:
+            metrics.CACHE_REQUESTS.labels("market_cap", "hit").inc()
+            coins, snapshot_age = market_cap_cache.value, market_cap_cache.age()
+        else:
+            coins, snapshot_age = await market_cap_cache.get()
+        
+        if not coins:
+            raise HTTPException(status_code=500, detail="Could not fetch market cap list")
+        coins = coins[:limit]
+        return {
+            "success": True,
+            "tickers": [coin["ticker"] for coin in coins],
+            "coins": coins,
+            "total": len(coins),
+            "snapshot_age": round(snapshot_age, 1)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch market cap list: {str(e)}")
+
+def create_candle_source(source: str):
+    if source == "synthetic":
+        return SyntheticCandleSource()
+    if source == "geckoterminal":
+        return GeckoTerminalCandleSource(geckoterminal_client, worker_rate_limiter(GECKOTERMINAL_RATE_LIMIT, 5))
+    raise ValueError(f"Unknown CANDLE_SOURCE: {source}")
+
+def trending_pairs():
+    """(chain_id, pair_address) of every chart in the current trending snapshot"""
+    return [
+        (chart["chainId"], chart["pairAddress"])
+        for chart in trending_cache.value or []
+        if chart.get("chainId") and chart.get("pairAddress")
+    ]
+
+candle_ingestor = CandleIngestor(
+    CandleStore(INTERVALS[CANDLE_BASE_INTERVAL], CANDLE_HISTORY_BARS, CANDLE_MAX_PAIRS),
+    create_candle_source(CANDLE_SOURCE), CANDLE_HISTORY_BARS, trending_pairs,
+    CANDLE_REFRESH_INTERVAL, CANDLE_MAX_AGE, CANDLE_FAILURE_TTL,
+)
+
+@app.get("/api/candles/{chain_id}/{pair_address}")
+async def get_candles(chain_id: str, pair_address: str, interval: str = "1h", limit: int = 200):
+    """OHLCV candles for a pair at any selector interval, as columns (time, open, high, low, close, volume).
+    
+    Trending pairs are ingested in the background; any other pair is fetched on first request."""
+    if not CANDLE_PATH_PATTERN.match(chain_id) or not CANDLE_PATH_PATTERN.match(pair_address):
+        raise HTTPException(status_code=400, detail="Invalid chain id or pair address")
+    if interval not in INTERVALS or INTERVALS[interval] < INTERVALS[CANDLE_BASE_INTERVAL]:
+        allowed = [name for name, seconds in INTERVALS.items() if seconds >= INTERVALS[CANDLE_BASE_INTERVAL]]
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(allowed)}")
+    if not 0 < limit <= MAX_CANDLES:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_CANDLES}")
+    
+    try:
+        series = await candle_ingestor.ensure(chain_id, pair_address)
+    except Exception as e:
+        # A failed top-up still leaves older candles worth serving
+        series = candle_ingestor.store.get(CandleIngestor.key(chain_id, pair_address))
+        if series is None:
+            if isinstance(e, CandleNotFound):
+                raise HTTPException(status_code=404, detail=str(e))
+            raise HTTPException(status_code=500, detail=f"Failed to fetch candles: {str(e)}")
+    
+    candles = series.window(INTERVALS[interval], limit)
+    return ORJSONResponse({
+        "success": True,
+        "chain_id": chain_id,
+        "pair_address": pair_address,
+        "interval": interval,
+        "candles": candles,
+        "total": len(candles["time"])
+    })
+
+@app.get("/api/candles-status")
+async def get_candles_status():
+    """Report candle ingestion progress and store size"""
+    return candle_ingestor.status()
+
+class SymbolPairIndex:
+    """Symbol -> best pair index shared by every request in the process.
+    
+    Entries expire after ttl (misses after the shorter miss_ttl), at most
+    max_entries are kept with the least recently used evicted first, and a
+    symbol that several requests need at once is only looked up upstream once."""
+    
+    def __init__(self, ttl: float, miss_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # symbol -> (pair or None, expires_at), least recently used first
+        self._inflight = {}  # symbol -> asyncio.Task
+        self._dirty = set()  # resolved symbols not persisted yet
+    
+    def lookup(self, symbol: str):
+        """Return (hit, pair) without touching the upstream"""
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return False, None
+        pair, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[symbol]
+            return False, None
+        self._entries.move_to_end(symbol)
+        return True, pair
+    
+    def _store(self, symbol: str, pair: Optional[dict], expires_at: float):
+        self._entries[symbol] = (pair, expires_at)
+        self._entries.move_to_end(symbol)
+        if len(self._entries) > self.max_entries:
+            self.purge_expired()
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._dirty.discard(evicted)
+    
+    def purge_expired(self) -> int:
+        """Drop every expired entry, not just the ones looked up again; returns how many went"""
+        now = time.monotonic()
+        expired = [symbol for symbol, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for symbol in expired:
+            del self._entries[symbol]
+        return len(expired)
+    
+    def put(self, symbol: str, pair: Optional[dict]):
+        ttl = self.ttl if pair is not None else self.miss_ttl
+        self._store(symbol, pair, time.monotonic() + ttl)
+        if pair is not None:
+            self._dirty.add(symbol)
+    
+    def restore(self, symbol: str, pair: dict, ttl: float):
+        """Install a saved resolution with its remaining ttl, unless the symbol was resolved meanwhile"""
+        if symbol in self._entries:
+            return
+        self._store(symbol, pair, time.monotonic() + min(ttl, self.ttl))
+    
+    def drain_dirty(self) -> List[tuple]:
+        """(symbol, pair, remaining_ttl) for every live resolution added since the last drain"""
+        now = time.monotonic()
+        entries = []
+        for symbol in self._dirty:
+            pair, expires_at = self._entries.get(symbol, (None, now))
+            if pair is not None and expires_at > now:
+                entries.append((symbol, pair, expires_at - now))
+        self._dirty.clear()
+        return entries
+    
+    def mark_dirty(self, symbols):
+        self._dirty.update(symbols)
+    
+    async def _fetch(self, symbol: str) -> Optional[dict]:
+        try:
+            pair = await search_best_pair(symbol)
+            self.put(symbol, pair)
+            return pair
+        finally:
+            self._inflight.pop(symbol, None)
+    
+    async def resolve(self, symbol: str) -> Optional[dict]:
+        hit, pair = self.lookup(symbol)
+        metrics.CACHE_REQUESTS.labels("symbol_index", "hit" if hit else "miss").inc()
+        if hit:
+            return pair
+        task = self._inflight.get(symbol)
+        if task is None:
+            task = self._inflight[symbol] = asyncio.create_task(self._fetch(symbol))
+        return await asyncio.shield(task)
+    
+    async def resolve_many(self, symbols: List[str]) -> dict:
+        """Resolve distinct symbols concurrently; upstream failures resolve to None and aren't cached"""
+        unique_symbols = list(dict.fromkeys(symbols))
+        results = await asyncio.gather(*(self.resolve(symbol) for symbol in unique_symbols), return_exceptions=True)
+        resolved = {}
+        for symbol, result in zip(unique_symbols, results):
+            if isinstance(result, Exception):
+                print(f"Failed to resolve ticker {symbol}: {result}")
+                result = None
+            resolved[symbol] = result
+        return resolved
+    
+    def __len__(self):
+        return len(self._entries)
+
+symbol_index = SymbolPairIndex(SYMBOL_INDEX_TTL, SYMBOL_INDEX_MISS_TTL, SYMBOL_INDEX_MAX_ENTRIES)
+
+def ticker_base_symbol(ticker: str) -> str:
+    """WIFUSDT -> WIF, using the same quote suffixes the ticker screen produces"""
+    ticker = ticker.strip().upper()
+    for suffix in ("USDT", "USDC", "SOL", "ETH"):
+        if ticker.endswith(suffix) and len(ticker) > len(suffix):
+            return ticker[:-len(suffix)]
+    return ticker
+
+@app.post("/api/resolve-tickers")
+async def resolve_tickers(request: TickerResolveRequest):
+    """Resolve a whole ticker list to best USDT/USDC pairs in one call"""
+    tickers = [ticker.strip().upper() for ticker in request.tickers if ticker.strip()]
+    
+    if not tickers:
+        raise HTTPException(status_code=400, detail="No tickers provided")
+    if len(tickers) > MAX_RESOLVE_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RESOLVE_TICKERS} tickers per request")
+    
+    try:
+        # Tickers outside TICKER_PATTERN resolve to no pair, the rest of the list still resolves
+        symbols = {ticker: ticker_base_symbol(ticker) for ticker in tickers if TICKER_PATTERN.match(ticker)}
+        resolved = await symbol_index.resolve_many(list(symbols.values()))
+        results = [
+            {"ticker": ticker, "pair": resolved.get(symbols.get(ticker))}
+            for ticker in tickers
+        ]
+        return ORJSONResponse({
+            "success": True,
+            "results": results,
+            "resolved": sum(1 for result in results if result["pair"] is not None)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to resolve tickers: {str(e)}")
+
+def choice_document(choice_data: ChartChoice) -> dict:
+    choice_dict = choice_data.dict()
+    # Assigned here rather than by the driver so a retried insert hits a duplicate key instead of a second copy
+    choice_dict['_id'] = str(uuid.uuid4())
+    choice_dict['timestamp'] = datetime.utcnow()
+    return choice_dict
+
+def summary_increments(choice_docs: List[dict]) -> dict:
+    """Per-session counter deltas for a batch of choices"""
+    increments = {}
+    for doc in choice_docs:
+        inc = increments.setdefault(doc['session_id'], {"total_charts": 0, "green_count": 0, "red_count": 0})
+        inc["total_charts"] += 1
+        if doc['choice'] in ('green', 'red'):
+            inc[f"{doc['choice']}_count"] += 1
+    return increments
+
+async def update_session_summaries(choice_docs: List[dict], progress: set):
+    """Fold a batch of votes into the per-session counters"""
+    now = datetime.utcnow()
+    await bulk_write_once(db.session_summaries, "session_summaries", {
+        session_id: UpdateOne({"_id": session_id}, {"$inc": inc, "$set": {"updated_at": now}}, upsert=True)
+        for session_id, inc in summary_increments(choice_docs).items()
+    }, progress)
+
+def count_choices(match: dict):
+    """Aggregate cursor of per-session counters over the choices matching match"""
+    return db.choices.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": "$session_id",
+            "total_charts": {"$sum": 1},
+            "green_count": {"$sum": {"$cond": [{"$eq": ["$choice", "green"]}, 1, 0]}},
+            "red_count": {"$sum": {"$cond": [{"$eq": ["$choice", "red"]}, 1, 0]}},
+        }},
+    ])
+
+# Choices stored before session summaries existed got a driver-assigned ObjectId; every
+# later one has a string _id and was counted into its summary when it was written
+LEGACY_CHOICES = {"_id": {"$type": "objectId"}}
+SESSION_SUMMARY_BACKFILL = "session_summaries_backfill"
+session_summary_backfill = {"done": False, "sessions": 0}
+
+async def add_legacy_counts(rows: List[dict], now: datetime):
+    """$inc each session's legacy counts and flag it in the same update, so a session is never counted twice"""
+    try:
+        await db.session_summaries.bulk_write([
+            UpdateOne(
+                {"_id": row["_id"], "legacy_counted": {"$ne": True}},
+                {
+                    "$inc": {key: row[key] for key in ("total_charts", "green_count", "red_count")},
+                    "$set": {"legacy_counted": True, "updated_at": now},
+                },
+                upsert=True
+            )
+            for row in rows
+        ], ordered=False)
+    except BulkWriteError as e:
+        # A duplicate key is the upsert of a session an earlier, interrupted pass already counted
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])) or e.details.get("writeConcernErrors"):
+            raise
+
+async def backfill_session_summaries():
+    """Count legacy choices into the session summaries, once per database.
+    
+    Runs in the background on startup; an interrupted pass is simply repeated by the
+    next one, and the migrations marker keeps later startups from scanning again."""
+    try:
+        if await db.migrations.find_one({"_id": SESSION_SUMMARY_BACKFILL}) is None:
+            now = datetime.utcnow()
+            rows = []
+            async for row in count_choices(LEGACY_CHOICES):
+                rows.append(row)
+                if len(rows) >= EXPORT_BATCH_SIZE:
+                    await add_legacy_counts(rows, now)
+                    session_summary_backfill["sessions"] += len(rows)
+                    rows = []
+            if rows:
+                await add_legacy_counts(rows, now)
+                session_summary_backfill["sessions"] += len(rows)
+            await db.migrations.update_one(
+                {"_id": SESSION_SUMMARY_BACKFILL}, {"$set": {"completed_at": datetime.utcnow()}}, upsert=True
+            )
+            print(f"Backfilled session summaries for {session_summary_backfill['sessions']} sessions")
+        session_summary_backfill["done"] = True
+    except Exception as e:
+        print(f"Failed to backfill session summaries: {e}")
+
+# Snapshot ids this worker has already upserted, so repeat votes skip that round trip
+known_snapshots = OrderedDict()
+
+def pair_snapshot_id(chart_data: dict) -> str:
+    """pairAddress plus a content-hash version, so identical snapshots share one document"""
+    canonical = json.dumps(chart_data, sort_keys=True, separators=(',', ':'), default=str)
+    version = hashlib.sha1(canonical.encode()).hexdigest()[:16]
+    return f"{chart_data.get('pairAddress') or 'unknown'}:{version}"
+
+async def store_pair_snapshots(snapshots: dict):
+    """Insert any snapshots not stored yet; existing ones are left as they are"""
+    new_snapshots = {snapshot_id: data for snapshot_id, data in snapshots.items() if snapshot_id not in known_snapshots}
+    if new_snapshots:
+        now = datetime.utcnow()
+        await db.pair_snapshots.bulk_write([
+            UpdateOne(
+                {"_id": snapshot_id},
+                {"$setOnInsert": {"pair_address": data.get('pairAddress'), "data": data, "created_at": now}},
+                upsert=True
+            )
+            for snapshot_id, data in new_snapshots.items()
+        ], ordered=False)
+    for snapshot_id in snapshots:
+        known_snapshots[snapshot_id] = True
+        known_snapshots.move_to_end(snapshot_id)
+    while len(known_snapshots) > KNOWN_SNAPSHOTS_MAX:
+        known_snapshots.popitem(last=False)
+
+async def bulk_write_once(collection, step: str, operations: dict, progress: set):
+    """Run {key: operation} unordered, skipping keys progress records as done for this step
+    and recording the ones that succeed, so retrying a batch never applies an $inc twice"""
+    pending = {key: operation for key, operation in operations.items() if (step, key) not in progress}
+    if not pending:
+        return
+    keys = list(pending)
+    try:
+        await collection.bulk_write(list(pending.values()), ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+        progress.update((step, key) for index, key in enumerate(keys) if index not in failed)
+        raise
+    progress.update((step, key) for key in keys)
+
+async def insert_choices(stored_docs: List[dict]):
+    """Insert choices, treating ones already stored by an earlier attempt as done"""
+    try:
+        if len(stored_docs) == 1:
+            await db.choices.insert_one(stored_docs[0])
+        else:
+            await db.choices.insert_many(stored_docs, ordered=False)
+    except DuplicateKeyError:
+        pass
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])) or e.details.get("writeConcernErrors"):
+            raise
+
+async def update_pair_stats(choice_docs: List[dict], progress: set):
+    """Fold a batch of votes into the cross-session per-pair leaderboard view"""
+    updates = {}
+    for doc in choice_docs:
+        chart_data = doc.get('chart_data') or {}
+        pair_address = chart_data.get('pairAddress')
+        if not pair_address:
+            continue
+        update = updates.setdefault(pair_address, {
+            "inc": {"green_count": 0, "red_count": 0, "total_votes": 0},
+            "set": {"symbol": chart_data.get('symbol'), "chain_id": chart_data.get('chainId')},
+            "last_voted": doc['timestamp']
+        })
+        update["inc"]["total_votes"] += 1
+        if doc['choice'] in ('green', 'red'):
+            update["inc"][f"{doc['choice']}_count"] += 1
+        update["last_voted"] = max(update["last_voted"], doc['timestamp'])
+    
+    await bulk_write_once(db.pair_stats, "pair_stats", {
+        pair_address: UpdateOne(
+            {"_id": pair_address},
+            {
+                "$inc": update["inc"],
+                "$set": update["set"],
+                "$max": {"last_voted": update["last_voted"]},
+                "$setOnInsert": {"tournament_wins": 0}
+            },
+            upsert=True
+        )
+        for pair_address, update in updates.items()
+    }, progress)
+
+async def write_choices(choice_docs: List[dict], progress: Optional[set] = None):
+    """Persist choice documents in as few round trips as possible.
+    
+    Safe to call again with the same documents and progress set after a failure:
+    snapshots and choices are keyed by _id, and counters already applied are skipped."""
+    if progress is None:
+        progress = set()
+    # Choices reference a deduplicated pair snapshot instead of embedding chart_data.
+    # Build new documents so a failed buffered flush can be retried with the originals.
+    snapshots = {}
+    stored_docs = []
+    for doc in choice_docs:
+        stored = {key: value for key, value in doc.items() if key != 'chart_data'}
+        if doc.get('chart_data'):
+            snapshot_id = pair_snapshot_id(doc['chart_data'])
+            snapshots[snapshot_id] = doc['chart_data']
+            stored['pair_snapshot'] = snapshot_id
+        stored_docs.append(stored)
+    
+    # Snapshots first so a stored choice never points at a missing snapshot
+    await store_pair_snapshots(snapshots)
+    
+    await insert_choices(stored_docs)
+    
+    await update_pair_stats(choice_docs, progress)
+    
+    # Keep the per-session summaries in step so results never have to count choices
+    await update_session_summaries(choice_docs, progress)
+
+choice_buffer = WriteBuffer(write_choices, CHOICE_BUFFER_SIZE, CHOICE_BUFFER_INTERVAL,
+                            CHOICE_BUFFER_MAX_PENDING, CHOICE_BUFFER_MAX_ATTEMPTS)
+
+async def ingest_choices(choice_docs: List[dict]):
+    if CHOICE_BUFFER_ENABLED:
+        await choice_buffer.add(choice_docs)
+    else:
+        await write_choices(choice_docs)
+
 @app.post("/api/record-choice")
 async def record_choice(choice_data: ChartChoice):
     """Record user's choice for a chart"""
     try:
-        choice_dict = choice_data.dict()
-        choice_dict['timestamp'] = datetime.utcnow()
-        
-        await db.choices.insert_one(choice_dict)
+        await ingest_choices([choice_document(choice_data)])
         return {"success": True, "message": "Choice recorded"}
+    except BufferFull:
+        raise HTTPException(status_code=503, detail="Too many choices waiting to be written, try again shortly")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to record choice: {str(e)}")
 
+@app.post("/api/record-choices")
+async def record_choices(batch: ChartChoiceBatch):
+    """Record a batch of choices in one request"""
+    if not batch.choices:
+        raise HTTPException(status_code=400, detail="No choices provided")
+    if len(batch.choices) > MAX_CHOICE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CHOICE_BATCH} choices per request")
+    
+    try:
+        await ingest_choices([choice_document(choice) for choice in batch.choices])
+        return {"success": True, "message": f"Recorded {len(batch.choices)} choices"}
+    except BufferFull:
+        raise HTTPException(status_code=503, detail="Too many choices waiting to be written, try again shortly")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to record choices: {str(e)}")
+
+async def attach_chart_data(choices: List[dict]):
+    """Join pair snapshots back onto choices with one $in query per page"""
+    snapshot_ids = list({choice["pair_snapshot"] for choice in choices if choice.get("pair_snapshot")})
+    snapshots = {}
+    if snapshot_ids:
+        async for snapshot in db.pair_snapshots.find({"_id": {"$in": snapshot_ids}}, {"data": 1}):
+            snapshots[snapshot["_id"]] = snapshot["data"]
+    
+    for choice in choices:
+        snapshot_id = choice.pop("pair_snapshot", None)
+        # Choices recorded before snapshots existed still embed chart_data
+        if "chart_data" not in choice:
+            choice["chart_data"] = snapshots.get(snapshot_id, {})
+
+async def load_session_summary(session_id: str) -> Optional[dict]:
+    """Point read of the session counters. Until the backfill has run, a session without
+    a summary may still have legacy choices, so those are counted - without writing."""
+    summary = await db.session_summaries.find_one({"_id": session_id})
+    if summary is not None or session_summary_backfill["done"]:
+        return summary
+    counts = await count_choices({"session_id": session_id}).to_list(length=1)
+    return counts[0] if counts else None
+
 @app.get("/api/session-results/{session_id}")
-async def get_session_results(session_id: str):
-    """Get results for a specific session"""
+async def get_session_results(session_id: str, include_choices: bool = False, skip: int = 0, limit: int = 100,
+                              if_none_match: Optional[str] = Header(None)):
+    """Get results for a specific session.
+    
+    Only the counters are returned unless include_choices is set, in which case
+    choices are paged by chart_index with skip/limit. Choices are append-only, so
+    the counters identify the session version behind the ETag; a 304 skips the
+    choices query entirely."""
+    if skip < 0 or not 0 < limit <= MAX_RESULTS_PAGE:
+        raise HTTPException(status_code=400, detail=f"skip must be >= 0 and limit between 1 and {MAX_RESULTS_PAGE}")
+    
     try:
-        choices = await db.choices.find({"session_id": session_id}).to_list(length=None)
+        summary = await load_session_summary(session_id)
         
-        if not choices:
+        if not summary:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        green_count = sum(1 for choice in choices if choice['choice'] == 'green')
-        red_count = sum(1 for choice in choices if choice['choice'] == 'red')
-        
-        # Clean up choices for response
-        clean_choices = []
-        for choice in choices:
-            clean_choice = {
-                "chart_index": choice["chart_index"],
-                "choice": choice["choice"],
-                "timestamp": choice["timestamp"],
-                "chart_data": choice.get("chart_data", {})
-            }
-            clean_choices.append(clean_choice)
+        version = f"{session_id}|{summary['total_charts']}|{summary['green_count']}|{summary['red_count']}"
+        if include_choices:
+            version += f"|{skip}|{limit}"
+        etag = hash_etag(version.encode())
+        if etag_matches(if_none_match, etag):
+            return conditional_response(None, etag, if_none_match)
         
-        return {
+        results = {
             "session_id": session_id,
-            "total_charts": len(choices),
-            "green_count": green_count,
-            "red_count": red_count,
-            "choices": clean_choices
+            "total_charts": summary["total_charts"],
+            "green_count": summary["green_count"],
+            "red_count": summary["red_count"]
         }
+        
+        if include_choices:
+            # Fetch one extra document to know whether another page exists
+            choices = await db.choices.find(
+                {"session_id": session_id},
+                {"_id": 0, "chart_index": 1, "choice": 1, "timestamp": 1, "chart_data": 1, "pair_snapshot": 1}
+            ).sort("chart_index", ASCENDING).skip(skip).limit(limit + 1).to_list(length=limit + 1)
+            has_more = len(choices) > limit
+            choices = choices[:limit]
+            
+            await attach_chart_data(choices)
+            results["choices"] = choices
+            results["next_skip"] = skip + limit if has_more else None
+        
+        return conditional_response(results, etag, if_none_match)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get session results: {str(e)}")
 
+def export_json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+EXPORT_CSV_COLUMNS = ["session_id", "chart_index", "choice", "timestamp", "pair_address", "symbol", "chart_data"]
+
+def export_csv_row(choice: dict) -> list:
+    chart_data = choice.get("chart_data") or {}
+    return [
+        choice.get("session_id"),
+        choice.get("chart_index"),
+        choice.get("choice"),
+        choice["timestamp"].isoformat() if isinstance(choice.get("timestamp"), datetime) else choice.get("timestamp"),
+        chart_data.get("pairAddress", ""),
+        chart_data.get("symbol", ""),
+        json.dumps(chart_data, default=export_json_default),
+    ]
+
+async def export_batches(query: dict, sort_field: str):
+    """Yield choices in fixed-size batches with snapshots joined, so memory stays flat"""
+    cursor = db.choices.find(query, {"_id": 0}).sort(sort_field, ASCENDING).batch_size(EXPORT_BATCH_SIZE)
+    batch = []
+    async for choice in cursor:
+        batch.append(choice)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            await attach_chart_data(batch)
+            yield batch
+            batch = []
+    if batch:
+        await attach_chart_data(batch)
+        yield batch
+
+async def stream_ndjson(query: dict, sort_field: str):
+    async for batch in export_batches(query, sort_field):
+        yield "".join(json.dumps(choice, default=export_json_default) + "\n" for choice in batch)
+
+async def stream_csv(query: dict, sort_field: str):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    yield buffer.getvalue()
+    async for batch in export_batches(query, sort_field):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(export_csv_row(choice) for choice in batch)
+        yield buffer.getvalue()
+
+@app.get("/api/export/choices")
+async def export_choices(
+    format: str = "ndjson",
+    session_id: Optional[List[str]] = Query(None),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Stream choices as NDJSON or CSV, filtered by session and/or timestamp range"""
+    require_admin_token(x_admin_token)
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    
+    query = {}
+    if session_id:
+        query["session_id"] = {"$in": session_id}
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lt"] = end
+    
+    # A single session is read in chart order off the session index, everything else by time
+    sort_field = "chart_index" if session_id and len(session_id) == 1 and not (start or end) else "timestamp"
+    
+    if format == "csv":
+        return StreamingResponse(
+            stream_csv(query, sort_field),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=choices.csv"}
+        )
+    return StreamingResponse(stream_ndjson(query, sort_field), media_type="application/x-ndjson")
+
+def summarize_explain(explain: dict) -> dict:
+    """Reduce an explain() result to the plan stages and execution counters that matter"""
+    stages = []
+    plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    # Newer servers wrap the classic plan in queryPlan
+    plan = plan.get('queryPlan', plan)
+    while plan:
+        stage = plan.get('stage')
+        if plan.get('indexName'):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get('inputStage')
+    execution = explain.get('executionStats', {})
+    return {
+        "winning_plan": stages,
+        "n_returned": execution.get('nReturned'),
+        "keys_examined": execution.get('totalKeysExamined'),
+        "docs_examined": execution.get('totalDocsExamined'),
+        "execution_ms": execution.get('executionTimeMillis'),
+    }
+
+@app.get("/api/admin/db-stats")
+async def get_db_stats(session_id: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Report index usage and explain plans for the hot choice queries"""
+    require_admin_token(x_admin_token)
+    
+    try:
+        if session_id is None:
+            # Explain against a real session so the plan reflects actual data
+            latest = await db.choices.find_one({}, {"session_id": 1}, sort=[("timestamp", -1)])
+            session_id = latest["session_id"] if latest else "unknown"
+        
+        index_usage = {}
+        for collection_name in DB_INDEXES:
+            stats = await db[collection_name].aggregate([{"$indexStats": {}}]).to_list(length=None)
+            index_usage[collection_name] = [
+                {
+                    "name": stat["name"],
+                    "key": stat["key"],
+                    "ops": stat.get("accesses", {}).get("ops", 0),
+                    "since": stat.get("accesses", {}).get("since"),
+                }
+                for stat in stats
+            ]
+        
+        hot_queries = {
+            "session_results": await db.choices.find({"session_id": session_id}).explain(),
+            "recent_choices": await db.choices.find({}).sort("timestamp", -1).limit(100).explain(),
+        }
+        
+        return {
+            "indexes": index_usage,
+            "queries": {name: summarize_explain(explain) for name, explain in hot_queries.items()},
+            "sample_session_id": session_id
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get database stats: {str(e)}")
+
+async def tournament_entrants(session_id: str) -> List[dict]:
+    """Entrants for a session's tournament: its green choices, one per pair"""
+    choices = await db.choices.find(
+        {"session_id": session_id, "choice": "green"},
+        {"_id": 0, "chart_index": 1, "chart_data": 1, "pair_snapshot": 1}
+    ).sort("chart_index", ASCENDING).to_list(length=None)
+    await attach_chart_data(choices)
+    
+    entrants = []
+    seen_pairs = set()
+    for choice in choices:
+        pair_address = choice["chart_data"].get("pairAddress")
+        if pair_address:
+            if pair_address in seen_pairs:
+                continue
+            seen_pairs.add(pair_address)
+        entrants.append({
+            "id": str(choice["chart_index"]),
+            "chart_index": choice["chart_index"],
+            "chart_data": choice["chart_data"]
+        })
+    return entrants
+
+def tournament_response(session_id: str, version: int, tournament: DoubleEliminationTournament) -> dict:
+    return {"session_id": session_id, "version": version, **tournament.view()}
+
+@app.post("/api/tournament/{session_id}/start")
+async def start_tournament(session_id: str, reset: bool = False):
+    """Seed a double-elimination tournament from the session's green choices, or resume an existing one"""
+    try:
+        if not reset:
+            existing = await db.tournaments.find_one({"_id": session_id})
+            if existing:
+                return tournament_response(session_id, existing["version"], DoubleEliminationTournament.from_dict(existing["state"]))
+        
+        entrants = await tournament_entrants(session_id)
+        try:
+            tournament = DoubleEliminationTournament(entrants)
+        except TournamentError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        now = datetime.utcnow()
+        await db.tournaments.replace_one(
+            {"_id": session_id},
+            {"state": tournament.to_dict(), "version": 0, "created_at": now, "updated_at": now},
+            upsert=True
+        )
+        return tournament_response(session_id, 0, tournament)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start tournament: {str(e)}")
+
+@app.get("/api/tournament/{session_id}")
+async def get_tournament(session_id: str):
+    """Current matchup, progress and (once finished) the top 3"""
+    try:
+        existing = await db.tournaments.find_one({"_id": session_id})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get tournament: {str(e)}")
+    
+    if not existing:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    return tournament_response(session_id, existing["version"], DoubleEliminationTournament.from_dict(existing["state"]))
+
+@app.post("/api/tournament/{session_id}/result")
+async def record_tournament_result(session_id: str, result: TournamentResult):
+    """Record the winner of the current matchup and return the next one"""
+    try:
+        existing = await db.tournaments.find_one({"_id": session_id})
+        if not existing:
+            raise HTTPException(status_code=404, detail="Tournament not found")
+        if result.version is not None and result.version != existing["version"]:
+            raise HTTPException(status_code=409, detail="Tournament has moved on since this matchup was served")
+        
+        tournament = DoubleEliminationTournament.from_dict(existing["state"])
+        try:
+            tournament.record_result(result.winner_id)
+        except TournamentError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Only applies if nobody recorded a result in between (e.g. a double-click)
+        version = existing["version"] + 1
+        update = await db.tournaments.update_one(
+            {"_id": session_id, "version": existing["version"]},
+            {"$set": {"state": tournament.to_dict(), "version": version, "updated_at": datetime.utcnow()}}
+        )
+        if update.matched_count == 0:
+            raise HTTPException(status_code=409, detail="Tournament has moved on since this matchup was served")
+        
+        if tournament.finished:
+            champion = tournament.entrant(tournament.rankings[0])
+            pair_address = champion["chart_data"].get("pairAddress")
+            if pair_address:
+                await db.pair_stats.update_one({"_id": pair_address}, {"$inc": {"tournament_wins": 1}}, upsert=True)
+        
+        return tournament_response(session_id, version, tournament)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to record tournament result: {str(e)}")
+
+@app.get("/api/leaderboard")
+async def get_leaderboard(sort: str = "green_count", limit: int = 50, min_votes: int = 0):
+    """Pairs the crowd rates most bullish across all sessions, read from the pair_stats view"""
+    if sort not in LEADERBOARD_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(LEADERBOARD_SORTS)}")
+    if not 0 < limit <= MAX_LEADERBOARD:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_LEADERBOARD}")
+    
+    try:
+        query = {"total_votes": {"$gte": min_votes}} if min_votes > 0 else {}
+        rows = await db.pair_stats.find(query).sort(sort, DESCENDING).limit(limit).to_list(length=limit)
+        
+        leaderboard = []
+        for row in rows:
+            total_votes = row.get("total_votes", 0)
+            leaderboard.append({
+                "pair_address": row["_id"],
+                "symbol": row.get("symbol"),
+                "chain_id": row.get("chain_id"),
+                "green_count": row.get("green_count", 0),
+                "red_count": row.get("red_count", 0),
+                "total_votes": total_votes,
+                "bullish_ratio": round(row.get("green_count", 0) / total_votes, 4) if total_votes else None,
+                "tournament_wins": row.get("tournament_wins", 0),
+                "last_voted": row.get("last_voted")
+            })
+        
+        return {"sort": sort, "leaderboard": leaderboard}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get leaderboard: {str(e)}")
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics in text exposition format"""
+    try:
+        # The mongo store counts its documents - while MongoDB is down, scrapes still get everything else
+        metrics.store_stats_collector.stats = await asyncio.wait_for(
+            trending_metadata_store.stats(), TRENDING_METADATA_STATS_TIMEOUT
+        )
+    except Exception as e:
+        print(f"Failed to get trending metadata stats, reporting the last ones: {e!r}")
+    snapshot_age = trending_cache.age()
+    if snapshot_age is not None:
+        metrics.TRENDING_SNAPSHOT_AGE.set(snapshot_age)
+    metrics.SYMBOL_INDEX_ENTRIES.set(len(symbol_index))
+    metrics.UPSTREAM_CIRCUIT_OPEN.set(1 if upstream_breaker.is_open else 0)
+    metrics.TRENDING_STREAM_SUBSCRIBERS.set(trending_broadcaster.subscribers)
+    return Response(generate_latest(metrics.REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/api/generate-session")
 async def generate_session():
     """Generate a new session ID"""
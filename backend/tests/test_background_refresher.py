@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import server
+
+
+class FakeClock:
+    """Replaces the module's time and asyncio.sleep: sleeping advances the clock instantly"""
+
+    def __init__(self, max_sleeps):
+        self.now = 1000.0
+        self.sleeps = []
+        self.max_sleeps = max_sleeps
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        if len(self.sleeps) >= self.max_sleeps:
+            raise asyncio.CancelledError
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(max_sleeps=5)
+    monkeypatch.setattr(server, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(server, "asyncio", SimpleNamespace(
+        sleep=clock.sleep, create_task=asyncio.create_task, shield=asyncio.shield, CancelledError=asyncio.CancelledError,
+    ))
+    # No jitter unless a test asks for it
+    monkeypatch.setattr(server.random, "uniform", lambda low, high: 1.0)
+    return clock
+
+
+def make_refresher(*results, interval=45, jitter=0.1, max_backoff=600):
+    results = list(results)
+
+    async def compute():
+        result = results.pop(0) if len(results) > 1 else results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    cache = server.SnapshotCache("test", compute, ttl=60, stale_ttl=300)
+    return server.BackgroundRefresher(cache, interval, jitter, max_backoff)
+
+
+def run_loop(refresher):
+    async def run():
+        with pytest.raises(asyncio.CancelledError):
+            await refresher._loop()
+    asyncio.run(run())
+
+
+def test_refresh_once_tracks_successes_and_failures(clock):
+    refresher = make_refresher(["a"], RuntimeError("429"), [], ["b"])
+
+    async def run():
+        return [await refresher.refresh_once() for _ in range(4)]
+
+    assert asyncio.run(run()) == [True, False, False, True]
+    assert refresher.cache.value == ["b"]
+    assert refresher.consecutive_failures == 0
+    assert refresher.last_error is None
+    assert refresher.last_success is not None
+
+
+def test_failures_back_off_exponentially_up_to_the_cap(clock):
+    refresher = make_refresher(RuntimeError("down"), interval=45, max_backoff=600)
+    run_loop(refresher)
+
+    assert clock.sleeps == [90, 180, 360, 600, 600]
+    assert refresher.consecutive_failures == 5
+    assert refresher.last_error == "down"
+    assert refresher.cache.value is None
+
+
+def test_a_success_resets_the_backoff(clock):
+    refresher = make_refresher(RuntimeError("down"), RuntimeError("down"), ["a"], interval=45)
+    run_loop(refresher)
+
+    assert clock.sleeps == [90, 180, 45, 45, 45]
+    assert refresher.status()["consecutive_failures"] == 0
+
+
+def test_delays_are_jittered_within_bounds():
+    refresher = make_refresher(["a"], interval=100, jitter=0.1)
+    delays = [refresher.next_delay() for _ in range(200)]
+
+    assert all(90 <= delay <= 110 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_a_restored_snapshot_delays_the_first_refresh(clock):
+    refresher = make_refresher(["fresh"], interval=45)
+    refresher.cache.restore(["saved"], age=30)
+    run_loop(refresher)
+
+    # Waits out the rest of the interval, then keeps the cadence
+    assert clock.sleeps == [15, 45, 45, 45, 45]
+    assert refresher.cache.value == ["fresh"]
+
+
+def test_an_old_restored_snapshot_is_refreshed_right_away(clock):
+    refresher = make_refresher(["fresh"], interval=45)
+    refresher.cache.restore(["saved"], age=300)
+    clock.max_sleeps = 1
+    run_loop(refresher)
+
+    assert clock.sleeps == [45]
+    assert refresher.cache.value == ["fresh"]
@@ -0,0 +1,68 @@
+import asyncio
+
+import orjson
+
+from broadcast import SnapshotBroadcaster, chart_diff
+
+
+def chart(address, price):
+    return {"pairAddress": address, "priceUsd": price}
+
+
+def parse(message):
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+    return fields["id"], fields["event"], orjson.loads(fields["data"])
+
+
+async def first_event(broadcaster, last_version):
+    stream = broadcaster.stream(last_version=last_version)
+    try:
+        assert await stream.__anext__() == b"retry: 5000\n\n"
+        return parse(await stream.__anext__())
+    finally:
+        await stream.aclose()
+
+
+def test_chart_diff():
+    before = [chart("a", 1), chart("b", 2)]
+    assert chart_diff(before, list(before), "pairAddress") is None
+    assert chart_diff(before, [chart("b", 3), chart("c", 1)], "pairAddress") == {
+        "upserted": [chart("b", 3), chart("c", 1)], "removed": ["a"], "order": ["b", "c"],
+    }
+    assert chart_diff(before, before[::-1], "pairAddress") == {"upserted": [], "removed": [], "order": ["b", "a"]}
+
+
+def test_event_ids_carry_the_process_epoch():
+    broadcaster = SnapshotBroadcaster("pairAddress")
+    broadcaster.publish([chart("a", 1)])
+    broadcaster.publish([chart("a", 2)])
+
+    event_id = broadcaster.event_id()
+    assert event_id == f"{broadcaster.epoch}-2"
+    assert broadcaster.last_version(event_id) == 2
+    assert broadcaster.last_version(f"{broadcaster.epoch}-1") == 1
+    # Issued by another worker, a previous run, or not at all
+    assert broadcaster.last_version(f"{SnapshotBroadcaster('pairAddress').epoch}-1") is None
+    assert broadcaster.last_version(f"{broadcaster.epoch}-3") is None
+    assert broadcaster.last_version("1") is None
+    assert broadcaster.last_version(None) is None
+
+
+def test_reconnect_gets_a_diff_or_a_snapshot():
+    broadcaster = SnapshotBroadcaster("pairAddress")
+    broadcaster.publish([chart("a", 1), chart("b", 1)])
+    broadcaster.publish([chart("a", 2), chart("b", 1)])
+
+    async def scenario():
+        event_id, kind, data = await first_event(broadcaster, None)
+        assert (event_id, kind, data["total"]) == (broadcaster.event_id(), "snapshot", 2)
+
+        _, kind, data = await first_event(broadcaster, broadcaster.last_version(f"{broadcaster.epoch}-1"))
+        assert kind == "diff"
+        assert data["upserted"] == [chart("a", 2)]
+
+        other_worker = f"{SnapshotBroadcaster('pairAddress').epoch}-1"
+        _, kind, _ = await first_event(broadcaster, broadcaster.last_version(other_worker))
+        assert kind == "snapshot"
+
+    asyncio.run(scenario())
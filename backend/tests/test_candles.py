@@ -0,0 +1,159 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from candles import (
+    INTERVALS, CandleIngestor, CandleNotFound, CandleSeries, CandleSource, CandleStore, SyntheticCandleSource,
+    bucket_starts,
+)
+
+MONDAY = 1704067200  # 2024-01-01 00:00 UTC
+
+
+def bar(time, open_, high, low, close, volume):
+    return (time, open_, high, low, close, volume)
+
+
+def test_ingest_sorts_and_replaces_bars():
+    series = CandleSeries(900, max_bars=100)
+    series.ingest([bar(1800, 3, 3, 3, 3, 1), bar(0, 1, 1, 1, 1, 1), bar(900, 2, 2, 2, 2, 1)])
+    assert series.time.tolist() == [0, 900, 1800]
+
+    # A row inside a stored bar replaces it, so the still-open bar updates
+    series.ingest([bar(1850, 3, 5, 2, 4, 7)])
+    assert len(series) == 3
+    assert series.columns["close"][-1] == 4
+    assert series.columns["volume"][-1] == 7
+
+
+def test_ingest_keeps_the_latest_max_bars():
+    series = CandleSeries(900, max_bars=3)
+    series.ingest([bar(i * 900, i, i, i, i, i) for i in range(5)])
+    assert series.time.tolist() == [1800, 2700, 3600]
+    assert series.last_time == 3600
+
+
+def test_weeks_start_on_monday():
+    week = INTERVALS["1w"]
+    times = np.array([MONDAY, MONDAY + 6 * 86400 + 86399, MONDAY - 1, MONDAY + week])
+    assert bucket_starts(times, week).tolist() == [MONDAY, MONDAY, MONDAY - week, MONDAY + week]
+
+
+def test_resample_aggregates_like_a_naive_loop():
+    rng = np.random.default_rng(7)
+    start = MONDAY - 3 * 86400
+    times = start + np.sort(rng.choice(2000, size=600, replace=False)) * 900
+    closes = rng.uniform(1, 2, size=len(times))
+    rows = [
+        bar(t, c * 0.99, c * 1.01 + h, c * 0.98 - h, c, v)
+        for t, c, h, v in zip(times, closes, rng.uniform(0, 0.1, len(times)), rng.uniform(0, 1e6, len(times)))
+    ]
+    series = CandleSeries(900, max_bars=1000)
+    series.ingest(rows)
+
+    for name in ("1h", "4h", "1d", "1w"):
+        seconds = INTERVALS[name]
+        buckets = {}
+        for t, o, h, l, c, v in zip(series.time, *(series.columns[k] for k in ("open", "high", "low", "close", "volume"))):
+            start_time = int(bucket_starts(np.array([t]), seconds)[0])
+            if start_time not in buckets:
+                buckets[start_time] = [o, h, l, c, v]
+            else:
+                agg = buckets[start_time]
+                agg[1], agg[2], agg[3], agg[4] = max(agg[1], h), min(agg[2], l), c, agg[4] + v
+        resampled = series.resample(seconds)
+        assert resampled["time"].tolist() == sorted(buckets)
+        expected = np.array([buckets[t] for t in sorted(buckets)])
+        for index, column in enumerate(("open", "high", "low", "close", "volume")):
+            assert np.allclose(resampled[column], expected[:, index]), (name, column)
+
+
+def test_resample_is_cached_until_the_next_ingest():
+    series = CandleSeries(900, max_bars=100)
+    series.ingest([bar(i * 900, 1, 1, 1, 1, 1) for i in range(8)])
+    first = series.resample(3600)
+    assert series.resample(3600) is first
+    series.ingest([bar(8 * 900, 1, 1, 1, 1, 1)])
+    assert series.resample(3600) is not first
+    assert series.resample(3600)["volume"].tolist() == [4, 4, 1]
+
+
+def test_resample_rejects_intervals_that_are_not_multiples():
+    with pytest.raises(ValueError):
+        CandleSeries(3600, max_bars=10).resample(900 * 5)
+
+
+class MissingSource(CandleSource):
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch(self, chain_id, pair_address, base_seconds, since, limit):
+        self.calls += 1
+        raise CandleNotFound(f"no pool {pair_address}")
+
+
+def make_ingestor(source, failure_ttl=60):
+    return CandleIngestor(CandleStore(900, 2880, 16), source, 2880, lambda: [], 0, 300, failure_ttl)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(source, failure_ttl=60):
+        ingestor = make_ingestor(source, failure_ttl)
+        monkeypatch.setattr(server, "candle_ingestor", ingestor)
+        return ingestor
+    # No context manager: the lifespan (MongoDB, refreshers) is not started
+    return TestClient(server.app), install
+
+
+def test_candles_endpoint_serves_synthetic_candles(client):
+    http, install = client
+    install(SyntheticCandleSource())
+
+    response = http.get("/api/candles/solana/abc123?interval=1h&limit=50")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 50
+    candles = body["candles"]
+    assert len(candles["close"]) == 50
+    assert all(t % 3600 == 0 for t in candles["time"])
+    assert candles["time"] == sorted(candles["time"])
+    assert all(h >= l for h, l in zip(candles["high"], candles["low"]))
+
+    # Same synthetic data every time, served from the store
+    assert http.get("/api/candles/solana/abc123?interval=1h&limit=50").json()["candles"] == candles
+
+
+def test_candles_endpoint_validates_parameters(client):
+    http, install = client
+    install(SyntheticCandleSource())
+    assert http.get("/api/candles/solana/abc?interval=5m").status_code == 400
+    assert http.get("/api/candles/solana/abc?limit=0").status_code == 400
+    assert http.get("/api/candles/solana/a.b?interval=1h").status_code == 400
+
+
+def test_unknown_pair_is_a_cached_404(client):
+    http, install = client
+    source = MissingSource()
+    install(source)
+
+    for _ in range(3):
+        response = http.get("/api/candles/solana/nope?interval=1h")
+        assert response.status_code == 404
+    assert source.calls == 1
+
+
+def test_failed_fetch_is_retried_after_failure_ttl():
+    source = MissingSource()
+    ingestor = make_ingestor(source, failure_ttl=0)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(CandleNotFound):
+                await ingestor.ensure("solana", "nope")
+
+    asyncio.run(run())
+    assert source.calls == 2
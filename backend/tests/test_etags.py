@@ -0,0 +1,42 @@
+from etags import content_etag, etag_matches, hash_etag, projection_etag
+
+
+def test_etags_are_weak_and_stable():
+    etag = content_etag({"charts": [1, 2, 3]})
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == content_etag({"charts": [1, 2, 3]})
+    assert etag != content_etag({"charts": [1, 2, 4]})
+    assert hash_etag(b"abc") == hash_etag(b"abc")
+
+
+def test_projection_etag():
+    etag = content_etag([{"a": 1}])
+    assert projection_etag(etag, None) == etag
+    assert projection_etag(etag, ()) == etag
+    assert projection_etag(etag, ("a",)) != etag
+    assert projection_etag(etag, ("a",)) == projection_etag(etag, ("a",))
+    assert projection_etag(etag, ("a",)) != projection_etag(etag, ("a", "b"))
+
+
+def test_etag_matches_exact_and_weak_forms():
+    etag = 'W/"abc"'
+    assert etag_matches('W/"abc"', etag)
+    # Weak comparison ignores the W/ prefix on either side
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', '"abc"')
+    assert not etag_matches('W/"abd"', etag)
+
+
+def test_etag_matches_lists_and_wildcard():
+    etag = 'W/"abc"'
+    assert etag_matches('W/"xyz", W/"abc"', etag)
+    assert etag_matches('"xyz",W/"abc"', etag)
+    assert not etag_matches('W/"xyz", W/"uvw"', etag)
+    assert etag_matches("*", etag)
+
+
+def test_etag_matches_needs_both_sides():
+    assert not etag_matches(None, 'W/"abc"')
+    assert not etag_matches("", 'W/"abc"')
+    assert not etag_matches('W/"abc"', None)
+    assert not etag_matches("*", None)
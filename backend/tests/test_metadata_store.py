@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import metadata_store
+from metadata_store import InMemoryMetadataStore, MetadataTooLarge, encode_payload
+
+
+def charts(count, tag=""):
+    return [
+        {"pairAddress": f"pair{tag}{index}", "chainId": "solana", "baseToken": {"symbol": f"T{index}", "name": "x" * 40}}
+        for index in range(count)
+    ]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_projected_views_are_capped_and_counted():
+    store = InMemoryMetadataStore(max_entries=10, max_bytes=10 ** 6, ttl=60)
+    stored = charts(20)
+
+    async def scenario():
+        await store.put("s1", stored)
+        for index in range(store.MAX_VIEWS + 4):
+            projected, _ = await store.lookup("s1", ("pairAddress", f"extra{index}"))
+            assert projected == [{"pairAddress": chart["pairAddress"]} for chart in stored]
+
+    run(scenario())
+    _, size, _, _, views = store._entries["s1"]
+    assert len(views) == store.MAX_VIEWS
+    # The oldest views went first
+    assert ("pairAddress", "extra0") not in views and ("pairAddress", "extra11") in views
+    view_bytes = sum(view_size for _, view_size in views.values())
+    assert size == encode_payload(stored)[0] + view_bytes
+    assert store.total_bytes == size
+
+
+def test_views_count_towards_the_byte_cap():
+    full_size = encode_payload(charts(20))[0]
+    store = InMemoryMetadataStore(max_entries=10, max_bytes=int(full_size * 2.5), ttl=60)
+
+    async def scenario():
+        await store.put("s1", charts(20, "a"))
+        await store.put("s2", charts(20, "b"))
+        assert store.evictions["bytes"] == 0
+        # Projections of s2 push the store past max_bytes, so the least recently used s1 goes
+        await store.lookup("s2", ("baseToken",))
+        return await store.get("s1")
+
+    assert run(scenario()) is None
+    assert store.evictions["bytes"] == 1
+    assert store.total_bytes <= store.max_bytes
+    assert list(store._entries) == ["s2"]
+
+
+def test_projected_lookup_has_its_own_etag():
+    store = InMemoryMetadataStore(max_entries=10, max_bytes=10 ** 6, ttl=60)
+
+    async def scenario():
+        await store.put("s1", charts(3))
+        _, full_etag = await store.lookup("s1")
+        _, slim_etag = await store.lookup("s1", ("pairAddress",))
+        assert slim_etag != full_etag
+        assert await store.etag("s1", ("pairAddress",)) == slim_etag
+
+    run(scenario())
+
+
+def test_least_recently_used_entry_is_evicted_beyond_max_entries():
+    store = InMemoryMetadataStore(max_entries=3, max_bytes=10 ** 6, ttl=60)
+
+    async def scenario():
+        for key in ("s1", "s2", "s3"):
+            await store.put(key, charts(2, key))
+        assert await store.get("s1") is not None  # s1 is now the most recently used
+        await store.put("s4", charts(2, "s4"))
+        return [key for key in ("s1", "s2", "s3", "s4") if await store.get(key) is not None]
+
+    assert run(scenario()) == ["s1", "s3", "s4"]
+    assert store.evictions == {"expired": 0, "entries": 1, "bytes": 0}
+
+
+def test_entries_are_evicted_to_stay_under_max_bytes():
+    size = encode_payload(charts(10, "s0"))[0]
+    store = InMemoryMetadataStore(max_entries=100, max_bytes=size * 3, ttl=60)
+
+    async def scenario():
+        for index in range(5):
+            await store.put(f"s{index}", charts(10, f"s{index}"))
+
+    run(scenario())
+    assert list(store._entries) == ["s2", "s3", "s4"]
+    assert store.total_bytes == sum(entry[1] for entry in store._entries.values())
+    assert store.total_bytes <= store.max_bytes
+    assert store.evictions["bytes"] == 2
+
+
+def test_oversized_entry_is_rejected():
+    store = InMemoryMetadataStore(max_entries=10, max_bytes=100, ttl=60)
+    with pytest.raises(MetadataTooLarge):
+        run(store.put("s1", charts(10)))
+    assert store.total_bytes == 0
+
+
+def test_replacing_an_entry_releases_its_bytes():
+    store = InMemoryMetadataStore(max_entries=10, max_bytes=10 ** 6, ttl=60)
+
+    async def scenario():
+        await store.put("s1", charts(10))
+        await store.put("s1", charts(2))
+
+    run(scenario())
+    assert store.total_bytes == encode_payload(charts(2))[0]
+
+
+def test_expired_entries_miss_and_are_purged(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metadata_store, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    store = InMemoryMetadataStore(max_entries=10, max_bytes=10 ** 6, ttl=60)
+
+    async def scenario():
+        await store.put("s1", charts(2))
+        await store.put("s2", charts(2), ttl=10)
+        now[0] += 30
+        assert await store.get("s2") is None
+        assert await store.get("s1") is not None
+        now[0] += 31
+        # put purges every expired entry, not only the one being looked up
+        await store.put("s3", charts(2))
+
+    run(scenario())
+    assert list(store._entries) == ["s3"]
+    assert store.evictions["expired"] == 2
+    assert store.hits == 1 and store.misses == 1
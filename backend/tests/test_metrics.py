@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+import metrics
+import server
+
+
+class UnreachableStore:
+    """A metadata store whose stats wait on a database that is down"""
+
+    def __init__(self, hang):
+        self.hang = hang
+
+    async def stats(self):
+        if self.hang:
+            await asyncio.sleep(60)
+        raise ConnectionError("No servers found yet")
+
+
+@pytest.mark.parametrize("hang", [False, True])
+def test_metrics_scrape_survives_an_unreachable_store(monkeypatch, hang):
+    last = {"backend": "mongo", "entries": 7, "hits": 3, "misses": 1}
+    monkeypatch.setattr(metrics.store_stats_collector, "stats", last)
+    monkeypatch.setattr(server, "trending_metadata_store", UnreachableStore(hang))
+    monkeypatch.setattr(server, "TRENDING_METADATA_STATS_TIMEOUT", 0.05)
+
+    response = asyncio.run(server.get_metrics())
+
+    assert response.status_code == 200
+    assert b'trending_metadata_entries{backend="mongo"} 7.0' in response.body
+    assert metrics.store_stats_collector.stats is last
+
+
+def test_metadata_stats_endpoint_reports_an_unreachable_store(monkeypatch):
+    monkeypatch.setattr(server, "trending_metadata_store", UnreachableStore(False))
+
+    with pytest.raises(server.HTTPException) as error:
+        asyncio.run(server.get_trending_metadata_stats())
+
+    assert error.value.status_code == 500
+    assert "No servers found yet" in error.value.detail
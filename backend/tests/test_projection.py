@@ -0,0 +1,69 @@
+import pytest
+
+from projection import MAX_FIELDS, SLIM_FIELDS, parse_fields, project, project_charts
+
+CHART = {
+    "pairAddress": "pair1",
+    "chainId": "solana",
+    "baseToken": {"symbol": "WIF", "name": "dogwifhat", "address": "tok1"},
+    "quoteToken": {"symbol": "USDC"},
+    "volume": {"h24": 12345.6, "h6": None},
+    "info": None,
+}
+
+
+def test_parse_fields_normalizes_to_a_sorted_tuple():
+    assert parse_fields("chainId, pairAddress,chainId") == ("chainId", "pairAddress")
+    assert parse_fields("b,a") == parse_fields("a,b")
+
+
+def test_parse_fields_without_a_projection():
+    assert parse_fields(None) is None
+    assert parse_fields("") is None
+    assert parse_fields(" , ") is None
+
+
+def test_parse_fields_slim_wins():
+    assert parse_fields("chainId", slim=True) == SLIM_FIELDS
+
+
+def test_parse_fields_drops_paths_covered_by_a_parent():
+    assert parse_fields("baseToken.symbol,baseToken,chainId") == ("baseToken", "chainId")
+    # A shared prefix that isn't a parent path is kept
+    assert parse_fields("base,baseToken.symbol") == ("base", "baseToken.symbol")
+
+
+@pytest.mark.parametrize("fields", ["a..b", ".a", "a.", "a-b", "a b", "$where"])
+def test_parse_fields_rejects_invalid_paths(fields):
+    with pytest.raises(ValueError):
+        parse_fields(fields)
+
+
+def test_parse_fields_limits_the_field_count():
+    parse_fields(",".join(f"f{i}" for i in range(MAX_FIELDS)))
+    with pytest.raises(ValueError):
+        parse_fields(",".join(f"f{i}" for i in range(MAX_FIELDS + 1)))
+
+
+def test_project_copies_nested_paths():
+    assert project(CHART, ("baseToken.symbol", "chainId", "volume.h24")) == {
+        "baseToken": {"symbol": "WIF"},
+        "chainId": "solana",
+        "volume": {"h24": 12345.6},
+    }
+    assert project(CHART, ("baseToken",)) == {"baseToken": CHART["baseToken"]}
+
+
+def test_project_skips_missing_paths_and_keeps_null_values():
+    assert project(CHART, ("missing", "baseToken.missing", "info.url", "chainId.deeper")) == {}
+    assert project(CHART, ("volume.h6", "info")) == {"volume": {"h6": None}, "info": None}
+
+
+def test_project_charts_does_not_modify_the_input():
+    charts = [CHART, {"pairAddress": "pair2"}]
+    projected = project_charts(charts, SLIM_FIELDS)
+    assert projected == [
+        {"pairAddress": "pair1", "chainId": "solana", "baseToken": {"symbol": "WIF"}, "quoteToken": {"symbol": "USDC"}},
+        {"pairAddress": "pair2"},
+    ]
+    assert CHART["baseToken"]["name"] == "dogwifhat"
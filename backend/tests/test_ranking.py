@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from ranking import RankingPolicy, pair_volume, parse_weights
+
+SEARCH_MIN_VOLUME = 10000
+VOLUMES = [None, 0, "0", -5, 1, 9999.99, 10000, "10000", 10000.01, "25000.5", 25000.5, 1e6, 1e15, 1e15 + 1]
+QUOTES = ["USDT", "usdc", "USDC", "SOL", "WETH", "", None]
+
+
+# The ranking code from before RankingPolicy, kept as the reference for the default policy
+
+def old_volume(pair):
+    return float(pair.get('volume', {}).get('h24', 0) or 0)
+
+
+def old_best_per_token(pairs):
+    best_pairs = {}
+    for pair in pairs:
+        token_addr = (pair.get('baseToken', {}).get('address') or '').lower()
+        current = best_pairs.get(token_addr)
+        if current is None or old_volume(pair) > old_volume(current):
+            best_pairs[token_addr] = pair
+    return best_pairs
+
+
+def old_select_best_pair(pairs):
+    if not pairs:
+        return None
+    usdt_pairs = [p for p in pairs if p.get('quoteToken', {}).get('symbol', '').upper() in ['USDT', 'USDC']]
+    return max(usdt_pairs or pairs, key=old_volume)
+
+
+def old_search_pair(pairs):
+    best_pair = old_select_best_pair(pairs)
+    if best_pair and old_volume(best_pair) > SEARCH_MIN_VOLUME:
+        return best_pair
+    return None
+
+
+def old_rank(pairs, limit):
+    seen_addresses = set()
+    unique_pairs = []
+    for pair in pairs:
+        pair_addr = pair.get('pairAddress')
+        if pair_addr and pair_addr not in seen_addresses:
+            seen_addresses.add(pair_addr)
+            unique_pairs.append(pair)
+    unique_pairs.sort(key=old_volume, reverse=True)
+    return unique_pairs[:limit]
+
+
+def random_pair(rng, index):
+    pair = {
+        "pairAddress": rng.choice([f"pair{rng.randrange(40)}", f"pair{rng.randrange(40)}", None]),
+        "baseToken": {"address": rng.choice(["TokA", "toka", "TokB", "tokc", None])},
+        "quoteToken": {"symbol": rng.choice(QUOTES)} if rng.random() < 0.9 else {},
+        "volume": {"h24": rng.choice(VOLUMES)} if rng.random() < 0.9 else {},
+        "index": index,
+    }
+    if pair["quoteToken"].get("symbol") is None:
+        pair["quoteToken"].pop("symbol", None)
+    return pair
+
+
+def new_search_pair(policy, pairs):
+    best_pair = policy.best_pair(pairs)
+    if best_pair is not None and pair_volume(best_pair) > SEARCH_MIN_VOLUME:
+        return best_pair
+    return None
+
+
+@pytest.fixture
+def policy():
+    # The defaults in server.py
+    return RankingPolicy(parse_weights("volume=1"), min_volume=0, preferred_quotes=["USDT", "USDC"])
+
+
+def test_default_policy_matches_the_old_ranking(policy):
+    rng = random.Random(25)
+    for _ in range(500):
+        index = iter(range(10 ** 6))
+        batch = [random_pair(rng, next(index)) for _ in range(rng.randrange(0, 30))]
+        assert policy.best_per_key(batch, [(p.get('baseToken', {}).get('address') or '').lower() for p in batch]) \
+            == old_best_per_token(batch)
+
+        searches = [[random_pair(rng, next(index)) for _ in range(rng.randrange(0, 6))] for _ in range(10)]
+        new_searched = [new_search_pair(policy, pairs) for pairs in searches]
+        assert new_searched == [old_search_pair(pairs) for pairs in searches]
+
+        # Boosted pairs first, then searched ones, as build_trending_charts collects them
+        boosted = [random_pair(rng, next(index)) for _ in range(rng.randrange(0, 40))]
+        candidates = boosted + [pair for pair in new_searched if pair is not None]
+        limit = rng.choice([1, 5, 32, 100])
+        assert policy.rank(candidates, limit) == old_rank(candidates, limit)
+
+
+def test_boosted_pairs_under_the_search_floor_are_kept(policy):
+    boosted = [{"pairAddress": "small", "volume": {"h24": 500}}, {"pairAddress": "big", "volume": {"h24": 50000}}]
+    assert [pair["pairAddress"] for pair in policy.rank(boosted, 32)] == ["big", "small"]
+
+
+def test_filters():
+    pairs = [
+        {"pairAddress": "a", "volume": {"h24": 5000}, "liquidity": {"usd": 100}, "fdv": 1e6},
+        {"pairAddress": "b", "volume": {"h24": 20000}, "liquidity": {"usd": 100}, "fdv": 1e6},
+        {"pairAddress": "c", "volume": {"h24": 30000}, "liquidity": {"usd": 5000}, "fdv": 1e6},
+        {"pairAddress": "d", "volume": {"h24": 40000}, "liquidity": {"usd": 5000}, "fdv": 1e9},
+    ]
+    policy = RankingPolicy({"volume": 1}, min_volume=10000, min_liquidity=1000, max_fdv=1e8)
+    assert [pair["pairAddress"] for pair in policy.rank(pairs, 10)] == ["c"]
+
+
+def test_weighted_score():
+    pairs = [
+        {"pairAddress": "volume", "volume": {"h24": 1e6}, "liquidity": {"usd": 1e3}, "priceChange": {"h24": "-40"}},
+        {"pairAddress": "liquid", "volume": {"h24": 1e5}, "liquidity": {"usd": 1e6}, "priceChange": {"h24": "5"}},
+        {"pairAddress": "pump", "volume": {"h24": 1e5}, "liquidity": {"usd": 1e4}, "priceChange": {"h24": "80"}},
+    ]
+    volume_only = RankingPolicy({"volume": 1})
+    assert [pair["pairAddress"] for pair in volume_only.rank(pairs, 3)] == ["volume", "liquid", "pump"]
+    mixed = RankingPolicy({"volume": 1, "liquidity": 1, "price_change": 1})
+    assert [pair["pairAddress"] for pair in mixed.rank(pairs, 3)] == ["pump", "liquid", "volume"]
+
+
+def test_parse_weights():
+    assert parse_weights("volume=1, liquidity=0.5,") == {"volume": 1.0, "liquidity": 0.5}
+    with pytest.raises(ValueError):
+        RankingPolicy(parse_weights("volume=1,votes=2"))
@@ -0,0 +1,147 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import server
+from write_buffer import WriteBuffer
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().chartsdemo
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "known_snapshots", type(server.known_snapshots)())
+    return db
+
+
+def chart_choice(session_id, chart_index, vote, pair_address):
+    return server.ChartChoice(
+        session_id=session_id, chart_index=chart_index, choice=vote, timestamp=datetime.utcnow(),
+        chart_data={"pairAddress": pair_address, "symbol": "WIF", "chainId": "solana"},
+    )
+
+
+def batch():
+    return [server.choice_document(choice) for choice in (
+        chart_choice("s1", 0, "green", "pairA"),
+        chart_choice("s1", 1, "red", "pairB"),
+        chart_choice("s2", 0, "green", "pairA"),
+    )]
+
+
+def fail_once_after(monkeypatch, name):
+    """Make server.<name> fail once, after its writes went through"""
+    original = getattr(server, name)
+    failures = []
+
+    async def flaky(*args):
+        await original(*args)
+        if not failures:
+            failures.append(name)
+            raise ConnectionError(f"connection reset after {name}")
+
+    monkeypatch.setattr(server, name, flaky)
+    return failures
+
+
+async def stored_state(db):
+    choices = await db.choices.find({}, {"_id": 1}).to_list(length=None)
+    pair_stats = {doc["_id"]: (doc["green_count"], doc["red_count"], doc["total_votes"])
+                  async for doc in db.pair_stats.find()}
+    summaries = {doc["_id"]: (doc["total_charts"], doc["green_count"], doc["red_count"])
+                 async for doc in db.session_summaries.find()}
+    return len(choices), pair_stats, summaries
+
+
+EXPECTED = (
+    3,
+    {"pairA": (2, 0, 2), "pairB": (0, 1, 1)},
+    {"s1": (2, 1, 1), "s2": (1, 1, 0)},
+)
+
+
+@pytest.mark.parametrize("failing_step", ["insert_choices", "update_pair_stats", "update_session_summaries"])
+def test_retried_batch_is_written_exactly_once(mock_db, monkeypatch, failing_step):
+    failures = fail_once_after(monkeypatch, failing_step)
+    buffer = WriteBuffer(server.write_choices, max_size=100, interval=60, max_pending=100, max_attempts=3)
+
+    async def run():
+        await buffer.add(batch())
+        await buffer.flush()
+        assert len(buffer) == 3
+        await buffer.flush()
+        return await stored_state(mock_db)
+
+    assert asyncio.run(run()) == EXPECTED
+    assert failures == [failing_step]
+    assert (buffer.failed_flushes, len(buffer)) == (1, 0)
+
+
+def test_retry_after_a_partial_pair_stats_write(mock_db, monkeypatch):
+    # pairA's update went through, pairB's failed - only pairB may be applied again
+    async def partial(collection, step, operations, progress):
+        if step == "pair_stats" and not progress:
+            await collection.bulk_write([operations["pairA"]])
+            progress.add((step, "pairA"))
+            raise server.BulkWriteError({"writeErrors": [{"index": 1, "code": 91, "errmsg": "shutting down"}]})
+        await bulk_write_once(collection, step, operations, progress)
+
+    bulk_write_once = server.bulk_write_once
+    monkeypatch.setattr(server, "bulk_write_once", partial)
+    buffer = WriteBuffer(server.write_choices, max_size=100, interval=60, max_pending=100, max_attempts=3)
+
+    async def run():
+        await buffer.add(batch())
+        await buffer.flush()
+        await buffer.flush()
+        return await stored_state(mock_db)
+
+    assert asyncio.run(run()) == EXPECTED
+
+
+def test_bulk_write_once_records_the_keys_that_went_through(mock_db):
+    class PartlyFailing:
+        async def bulk_write(self, operations, ordered):
+            raise server.BulkWriteError({"writeErrors": [{"index": 1, "code": 91}]})
+
+    progress = set()
+    with pytest.raises(server.BulkWriteError):
+        asyncio.run(server.bulk_write_once(PartlyFailing(), "step", {"a": "op_a", "b": "op_b", "c": "op_c"}, progress))
+
+    assert progress == {("step", "a"), ("step", "c")}
+
+
+def test_choices_already_stored_are_not_an_error(mock_db):
+    docs = batch()
+
+    async def run():
+        await server.insert_choices(docs[:1])
+        await server.insert_choices(docs[:1])
+        await server.insert_choices(docs)
+        return await mock_db.choices.count_documents({})
+
+    assert asyncio.run(run()) == 3
+
+
+def test_full_buffer_is_a_503(mock_db, monkeypatch):
+    monkeypatch.setattr(server, "CHOICE_BUFFER_ENABLED", True)
+    monkeypatch.setattr(server, "choice_buffer", WriteBuffer(
+        server.write_choices, max_size=100, interval=60, max_pending=2, max_attempts=3,
+    ))
+
+    async def run():
+        await server.record_choice(chart_choice("s1", 0, "green", "pairA"))
+        with pytest.raises(server.HTTPException) as batch_error:
+            await server.record_choices(server.ChartChoiceBatch(choices=[
+                chart_choice("s1", 1, "green", "pairA"), chart_choice("s1", 2, "red", "pairB"),
+            ]))
+        await server.record_choice(chart_choice("s1", 1, "green", "pairA"))
+        with pytest.raises(server.HTTPException) as single_error:
+            await server.record_choice(chart_choice("s1", 2, "red", "pairB"))
+        return batch_error.value, single_error.value
+
+    batch_error, single_error = asyncio.run(run())
+    assert batch_error.status_code == single_error.status_code == 503
+    assert len(server.choice_buffer) == 2
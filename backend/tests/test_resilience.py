@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        # A real clock always moves on by at least its resolution, however short the sleep
+        self.now += max(seconds, 1e-6)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Replace the modules resilience sees, not time/asyncio themselves, which the event loop relies on
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(resilience, "asyncio", SimpleNamespace(sleep=clock.sleep, Lock=asyncio.Lock))
+    return clock
+
+
+def test_token_bucket_allows_a_burst_then_the_rate(clock):
+    bucket = TokenBucket(rate=5, capacity=3)
+
+    async def run():
+        for _ in range(3):
+            await bucket.acquire()
+        assert clock.sleeps == []
+        started = clock.now
+        for _ in range(10):
+            await bucket.acquire()
+        return clock.now - started
+
+    assert asyncio.run(run()) == pytest.approx(10 / 5, abs=1e-3)
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=5, capacity=3)
+
+    async def run():
+        for _ in range(3):
+            await bucket.acquire()
+        clock.now += 60  # idle far longer than it takes to refill
+        for _ in range(3):
+            await bucket.acquire()
+        assert clock.sleeps == []
+        await bucket.acquire()
+        assert sum(clock.sleeps) == pytest.approx(1 / 5, abs=1e-3)
+
+    asyncio.run(run())
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()  # a success resets the count
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert not breaker.is_open
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert breaker.status() == {"state": "open", "consecutive_failures": 3, "times_opened": 1, "retry_in": 30.0}
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_lets_one_trial_through_after_the_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 29
+    assert breaker.is_open
+    clock.now += 1
+    assert not breaker.is_open
+
+    breaker.before_call()
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+    assert not breaker.is_open
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    assert breaker.is_open
+    assert breaker.times_opened == 2
+    assert breaker.status()["retry_in"] == 30.0
+
+
+def test_abandoned_trial_frees_the_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 30
+
+    breaker.before_call()
+    breaker.abandon()
+    assert breaker.state == breaker.HALF_OPEN
+    assert not breaker.is_open
+    breaker.before_call()
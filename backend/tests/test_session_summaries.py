@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+import server
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().chartsdemo
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setitem(server.session_summary_backfill, "done", False)
+    monkeypatch.setitem(server.session_summary_backfill, "sessions", 0)
+    return db
+
+
+def choice(session_id, chart_index, vote):
+    return server.choice_document(server.ChartChoice(
+        session_id=session_id, chart_index=chart_index, choice=vote, timestamp=datetime.utcnow(),
+        chart_data={"pairAddress": f"pair{chart_index}", "symbol": "WIF", "chainId": "solana"},
+    ))
+
+
+def legacy_choice(session_id, chart_index, vote):
+    # As the baseline stored them: embedded chart_data and a driver-assigned ObjectId
+    return {"_id": ObjectId(), "session_id": session_id, "chart_index": chart_index, "choice": vote,
+            "chart_data": {"pairAddress": f"pair{chart_index}"}, "timestamp": datetime.utcnow()}
+
+
+def counters(summary):
+    return {key: summary[key] for key in ("total_charts", "green_count", "red_count")}
+
+
+def test_votes_increment_the_session_counters(mock_db):
+    async def run():
+        await server.write_choices([choice("s1", 0, "green"), choice("s1", 1, "red"), choice("s2", 0, "green")])
+        await server.write_choices([choice("s1", 2, "green")])
+        return await mock_db.session_summaries.find_one({"_id": "s1"}), await mock_db.session_summaries.find_one({"_id": "s2"})
+
+    s1, s2 = asyncio.run(run())
+    assert counters(s1) == {"total_charts": 3, "green_count": 2, "red_count": 1}
+    assert counters(s2) == {"total_charts": 1, "green_count": 1, "red_count": 0}
+
+
+def test_backfill_adds_legacy_choices_once(mock_db):
+    async def run():
+        await mock_db.choices.insert_many([legacy_choice("old", 0, "green"), legacy_choice("old", 1, "red"),
+                                           legacy_choice("quiet", 0, "red")])
+        # A vote on the old session after the deploy, before the backfill ran
+        await server.write_choices([choice("old", 2, "green")])
+        await server.backfill_session_summaries()
+        # An interrupted pass that never wrote its marker is repeated on the next startup
+        await mock_db.migrations.delete_many({})
+        await server.backfill_session_summaries()
+        return await mock_db.session_summaries.find_one({"_id": "old"}), await mock_db.session_summaries.find_one({"_id": "quiet"})
+
+    old, quiet = asyncio.run(run())
+    assert counters(old) == {"total_charts": 3, "green_count": 2, "red_count": 1}
+    assert counters(quiet) == {"total_charts": 1, "green_count": 0, "red_count": 1}
+    assert server.session_summary_backfill["done"]
+
+
+def test_backfill_runs_once_per_database(mock_db):
+    async def run():
+        await mock_db.choices.insert_one(legacy_choice("old", 0, "green"))
+        await server.backfill_session_summaries()
+        # Choices are never rewritten with an ObjectId, so a second scan would only cost time
+        await mock_db.session_summaries.delete_many({})
+        await server.backfill_session_summaries()
+        return await mock_db.session_summaries.count_documents({})
+
+    assert asyncio.run(run()) == 0
+
+
+def test_session_results_before_the_backfill(mock_db):
+    async def run():
+        await mock_db.choices.insert_many([legacy_choice("old", 0, "green"), legacy_choice("old", 1, "green")])
+        before = await server.load_session_summary("old")
+        missing = await server.load_session_summary("missing")
+        stored = await mock_db.session_summaries.count_documents({})
+        return before, missing, stored
+
+    before, missing, stored = asyncio.run(run())
+    assert counters(before) == {"total_charts": 2, "green_count": 2, "red_count": 0}
+    assert missing is None
+    # Reads never write summaries, only votes and the backfill do
+    assert stored == 0
@@ -0,0 +1,200 @@
+import asyncio
+import gc
+from types import SimpleNamespace
+
+import pytest
+
+import server
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(server, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+class FakeCompute:
+    """Compute function returning queued results (exceptions are raised), counting calls"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.release = None  # an asyncio.Event to hold every call on, when set
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+async def refreshed(cache):
+    return await cache.refresh()
+
+
+def test_failed_background_revalidation_is_retrieved(clock, capsys):
+    compute = FakeCompute(["a"], RuntimeError("circuit open"))
+    cache = server.SnapshotCache("test", compute, ttl=10, stale_ttl=60)
+    unhandled = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        await cache.get()
+        clock.now += 20
+        results = [await cache.get() for _ in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        gc.collect()
+        return results
+
+    assert asyncio.run(run()) == [(["a"], 20.0)] * 3
+    assert unhandled == []
+    assert compute.calls == 2
+    assert capsys.readouterr().out.count("Revalidating test snapshot failed") == 1
+
+
+def test_fresh_values_are_served_from_cache(clock):
+    compute = FakeCompute(["a"], ["b"])
+    cache = server.SnapshotCache("test", compute, ttl=10, stale_ttl=60)
+
+    async def run():
+        first = await cache.get()
+        clock.now += 5
+        return first, await cache.get()
+
+    assert asyncio.run(run()) == ((["a"], 0.0), (["a"], 5.0))
+    assert compute.calls == 1
+
+
+def test_concurrent_misses_share_one_computation(clock):
+    compute = FakeCompute(["a"])
+    cache = server.SnapshotCache("test", compute, ttl=10, stale_ttl=60)
+
+    async def run():
+        compute.release = asyncio.Event()
+        waiters = [asyncio.create_task(cache.get()) for _ in range(20)]
+        await asyncio.sleep(0)
+        compute.release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == [(["a"], 0.0)] * 20
+    assert compute.calls == 1
+
+
+def test_stale_value_is_served_while_revalidating(clock):
+    compute = FakeCompute(["a"], ["b"])
+    cache = server.SnapshotCache("test", compute, ttl=10, stale_ttl=60)
+
+    async def run():
+        await cache.get()
+        clock.now += 30
+        compute.release = asyncio.Event()
+        stale = [await cache.get() for _ in range(5)]
+        compute.release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return stale, await cache.get()
+
+    stale, fresh = asyncio.run(run())
+    assert stale == [(["a"], 30.0)] * 5
+    assert fresh == (["b"], 0.0)
+    # One revalidation for the whole stale window
+    assert compute.calls == 2
+
+
+def test_expired_value_falls_back_to_the_last_good_snapshot(clock):
+    compute = FakeCompute(["a"], RuntimeError("upstream down"), [])
+    cache = server.SnapshotCache("test", compute, ttl=10, stale_ttl=60)
+
+    async def run():
+        await cache.get()
+        clock.now += 100
+        failed = await cache.get()
+        clock.now += 100
+        return failed, await cache.get()
+
+    # A failure and an empty result both keep the last good snapshot, whatever its age
+    assert asyncio.run(run()) == ((["a"], 100.0), (["a"], 200.0))
+    assert compute.calls == 3
+
+
+def test_cold_start_failures_propagate_and_empty_results_are_not_cached(clock):
+    compute = FakeCompute(RuntimeError("upstream down"), [], ["a"])
+    cache = server.SnapshotCache("test", compute, ttl=10, stale_ttl=60)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await cache.get()
+        empty = await cache.get()
+        return empty, await cache.get()
+
+    assert asyncio.run(run()) == (([], 0.0), (["a"], 0.0))
+    assert compute.calls == 3
+
+
+def test_restore_only_installs_older_state_when_nothing_newer_exists(clock):
+    cache = server.SnapshotCache("test", FakeCompute(["fresh"]), ttl=10, stale_ttl=60,
+                                 derive=lambda value, key: [item.upper() for item in value], eager_views=("upper",))
+
+    assert cache.restore(["saved"], age=5)
+    assert (cache.value, cache.age(), cache.views) == (["saved"], 5.0, {"upper": ["SAVED"]})
+    assert cache.etag == server.content_etag(["saved"])
+    # An even older saved state loses to the current one
+    assert not cache.restore(["older"], age=8)
+    assert cache.value == ["saved"]
+
+    asyncio.run(refreshed(cache))
+    clock.now += 2
+    assert not cache.restore(["saved"], age=5)
+    assert (cache.value, cache.age()) == (["fresh"], 2.0)
+
+
+def test_views_are_derived_once_per_snapshot(clock):
+    derived = []
+
+    def derive(value, key):
+        derived.append(key)
+        return [f"{key}:{item}" for item in value]
+
+    compute = FakeCompute(["a"], ["b"])
+    cache = server.SnapshotCache("test", compute, ttl=10, stale_ttl=60, derive=derive, eager_views=("slim",))
+
+    asyncio.run(refreshed(cache))
+    assert cache.view("slim") == ["slim:a"]
+    assert cache.view("x") == cache.view("x") == ["x:a"]
+    assert derived == ["slim", "x"]
+    assert cache.view_etag("x") != cache.view_etag() == cache.etag
+
+    asyncio.run(refreshed(cache))
+    assert cache.views == {"slim": ["slim:b"]}
+    assert cache.view("x") == ["x:b"]
+
+
+def test_on_update_runs_for_each_new_snapshot(clock):
+    updates = []
+
+    async def on_update(value):
+        updates.append(value)
+
+    compute = FakeCompute(["a"], [], ["b"])
+    cache = server.SnapshotCache("test", compute, ttl=10, stale_ttl=60, on_update=on_update)
+
+    async def run():
+        for _ in range(3):
+            await cache.refresh()
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert updates == [["a"], ["b"]]
@@ -0,0 +1,164 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+import server
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(server, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+class FakeSearch:
+    """search_best_pair stand-in: pair(symbol), None for misses, a 429 for failures"""
+
+    def __init__(self, misses=(), failures=()):
+        self.misses = set(misses)
+        self.failures = set(failures)
+        self.calls = []
+        self.release = None
+
+    async def __call__(self, symbol):
+        self.calls.append(symbol)
+        if self.release is not None:
+            await self.release.wait()
+        if symbol in self.failures:
+            raise RuntimeError("429 Too Many Requests")
+        return None if symbol in self.misses else {"pairAddress": f"pair_{symbol}"}
+
+
+def pair(symbol):
+    return {"pairAddress": f"pair_{symbol}"}
+
+
+def test_invalid_tickers_resolve_to_no_pair(monkeypatch):
+    search = FakeSearch()
+    monkeypatch.setattr(server, "search_best_pair", search)
+    monkeypatch.setattr(server, "symbol_index", server.SymbolPairIndex(60, 60, 16))
+    request = server.TickerResolveRequest(tickers=["WIFUSDT", "BTC-USDT", "$PEPE", "ÅÄÖUSDT", "A" * 21])
+
+    body = orjson.loads(asyncio.run(server.resolve_tickers(request)).body)
+
+    assert search.calls == ["WIF"]
+    assert body["resolved"] == 1
+    assert [(result["ticker"], result["pair"]) for result in body["results"]] == [
+        ("WIFUSDT", {"pairAddress": "pair_WIF"}),
+        ("BTC-USDT", None),
+        ("$PEPE", None),
+        ("ÅÄÖUSDT", None),
+        ("A" * 21, None),
+    ]
+
+
+def test_entries_expire_after_their_ttl(clock):
+    index = server.SymbolPairIndex(ttl=300, miss_ttl=60, max_entries=16)
+    index.put("WIF", pair("WIF"))
+    index.put("NOPE", None)
+
+    assert index.lookup("WIF") == (True, pair("WIF"))
+    assert index.lookup("NOPE") == (True, None)
+    clock.now += 60
+    assert index.lookup("NOPE") == (False, None)
+    assert index.lookup("WIF") == (True, pair("WIF"))
+    clock.now += 240
+    assert index.lookup("WIF") == (False, None)
+    assert len(index) == 0
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    index = server.SymbolPairIndex(ttl=300, miss_ttl=60, max_entries=3)
+    for symbol in ("A", "B", "C"):
+        index.put(symbol, pair(symbol))
+    index.lookup("A")
+    index.put("D", pair("D"))
+
+    assert list(index._entries) == ["C", "A", "D"]
+    # Evicted resolutions are not persisted either
+    assert sorted(symbol for symbol, _, _ in index.drain_dirty()) == ["A", "C", "D"]
+
+
+def test_expired_entries_are_purged_before_live_ones_are_evicted(clock):
+    index = server.SymbolPairIndex(ttl=300, miss_ttl=60, max_entries=3)
+    index.put("A", pair("A"))
+    index.put("MISS", None)
+    index.put("B", pair("B"))
+    clock.now += 61
+    index.put("C", pair("C"))
+
+    assert list(index._entries) == ["A", "B", "C"]
+    clock.now += 300
+    assert index.purge_expired() == 3
+    assert len(index) == 0
+
+
+def test_dirty_resolutions_drain_once_with_their_remaining_ttl(clock):
+    index = server.SymbolPairIndex(ttl=300, miss_ttl=60, max_entries=16)
+    index.put("WIF", pair("WIF"))
+    index.put("NOPE", None)
+    clock.now += 100
+
+    assert index.drain_dirty() == [("WIF", pair("WIF"), 200.0)]
+    assert index.drain_dirty() == []
+    # A failed save puts them back
+    index.mark_dirty(["WIF"])
+    assert index.drain_dirty() == [("WIF", pair("WIF"), 200.0)]
+
+
+def test_restore_keeps_newer_resolutions_and_caps_the_ttl(clock):
+    index = server.SymbolPairIndex(ttl=300, miss_ttl=60, max_entries=16)
+    index.put("WIF", {"pairAddress": "new"})
+    index.restore("WIF", {"pairAddress": "saved"}, ttl=200)
+    index.restore("BONK", pair("BONK"), ttl=10_000)
+
+    assert index.lookup("WIF") == (True, {"pairAddress": "new"})
+    clock.now += 300
+    assert index.lookup("BONK") == (False, None)
+    # Restored entries are already persisted
+    assert [symbol for symbol, _, _ in index.drain_dirty()] == []
+
+
+def test_concurrent_resolves_share_one_search(clock, monkeypatch):
+    search = FakeSearch()
+    monkeypatch.setattr(server, "search_best_pair", search)
+    index = server.SymbolPairIndex(ttl=300, miss_ttl=60, max_entries=16)
+
+    async def run():
+        search.release = asyncio.Event()
+        waiters = [asyncio.create_task(index.resolve("WIF")) for _ in range(10)]
+        await asyncio.sleep(0)
+        search.release.set()
+        resolved = await asyncio.gather(*waiters)
+        return resolved, await index.resolve("WIF")
+
+    resolved, cached = asyncio.run(run())
+    assert resolved == [pair("WIF")] * 10
+    assert cached == pair("WIF")
+    assert search.calls == ["WIF"]
+
+
+def test_failed_searches_resolve_to_none_and_are_not_cached(clock, monkeypatch):
+    search = FakeSearch(misses={"NOPE"}, failures={"BUSY"})
+    monkeypatch.setattr(server, "search_best_pair", search)
+    index = server.SymbolPairIndex(ttl=300, miss_ttl=60, max_entries=16)
+
+    async def run():
+        first = await index.resolve_many(["WIF", "BUSY", "NOPE", "WIF"])
+        return first, await index.resolve_many(["WIF", "BUSY", "NOPE"])
+
+    first, second = asyncio.run(run())
+    assert first == second == {"WIF": pair("WIF"), "BUSY": None, "NOPE": None}
+    # Misses are cached for miss_ttl, upstream failures are retried
+    assert search.calls == ["WIF", "BUSY", "NOPE", "BUSY"]
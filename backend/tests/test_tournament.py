@@ -0,0 +1,143 @@
+import asyncio
+import json
+import random
+from datetime import datetime
+
+import pytest
+
+import server
+from tournament import DoubleEliminationTournament, TournamentError
+
+
+def entrants(count):
+    return [{"id": f"e{index}", "chart_data": {"pairAddress": f"pair{index}"}} for index in range(count)]
+
+
+def play(tournament, pick):
+    """Play to the end, pick(matchup) choosing each winner; returns the matchups played"""
+    played = []
+    while not tournament.finished:
+        played.append(tournament.matchup)
+        tournament.record_result(pick(tournament.matchup))
+    return played
+
+
+def test_two_entrants_without_reset():
+    tournament = DoubleEliminationTournament(entrants(2))
+    assert tournament.phase == tournament.WINNERS
+    tournament.record_result("e0")
+    assert tournament.phase == tournament.GRAND_FINALS
+    assert tournament.matchup == ("e0", "e1")
+    tournament.record_result("e0")
+    assert tournament.finished
+    assert tournament.rankings == ["e0", "e1"]
+    assert tournament.matches_played == 2
+
+
+def test_grand_finals_reset():
+    tournament = DoubleEliminationTournament(entrants(2))
+    tournament.record_result("e0")
+    # The losers bracket side takes the first grand final, so the same pair plays again
+    tournament.record_result("e1")
+    assert not tournament.finished
+    assert tournament.phase == tournament.GRAND_FINALS
+    assert tournament.matchup == ("e0", "e1")
+    tournament.record_result("e1")
+    assert tournament.rankings == ["e1", "e0"]
+    assert tournament.matches_played == 3
+
+
+def test_reset_won_by_the_winners_champion():
+    tournament = DoubleEliminationTournament(entrants(2))
+    play(tournament, lambda matchup: "e0" if tournament.matches_played != 1 else "e1")
+    assert tournament.rankings == ["e0", "e1"]
+    assert tournament.matches_played == 3
+
+
+def test_three_entrants():
+    tournament = DoubleEliminationTournament(entrants(3))
+    played = play(tournament, lambda matchup: matchup[0])
+    assert played == [("e0", "e1"), ("e2", "e0"), ("e1", "e0"), ("e2", "e1")]
+    assert tournament.rankings == ["e2", "e1", "e0"]
+
+
+@pytest.mark.parametrize("count", [2, 3, 4, 5, 7, 8, 9, 16, 31])
+def test_any_entrant_count_finishes_with_double_elimination(count):
+    rng = random.Random(count)
+    for _ in range(20):
+        tournament = DoubleEliminationTournament(entrants(count))
+        play(tournament, rng.choice)
+
+        champion, runner_up = tournament.rankings[:2]
+        assert len(tournament.rankings) == min(count, 3)
+        assert len(set(tournament.rankings)) == len(tournament.rankings)
+        assert tournament.losses[champion] <= 1
+        # Everyone but the champion went out on their second loss
+        assert all(losses == 2 for entrant_id, losses in tournament.losses.items() if entrant_id != champion)
+        assert tournament.matches_played in (2 * count - 2, 2 * count - 1)
+        assert sorted(tournament.eliminated + [champion, runner_up]) == sorted(tournament.entrants)
+
+
+def test_state_round_trips_at_every_step():
+    rng = random.Random(5)
+    tournament = DoubleEliminationTournament(entrants(7))
+    while True:
+        # Through JSON, as it is stored in MongoDB between matches
+        restored = DoubleEliminationTournament.from_dict(json.loads(json.dumps(tournament.to_dict())))
+        assert restored.to_dict() == tournament.to_dict()
+        assert restored.view() == tournament.view()
+        if tournament.finished:
+            break
+        winner = rng.choice(tournament.matchup)
+        tournament.record_result(winner)
+        restored.record_result(winner)
+        assert restored.to_dict() == tournament.to_dict()
+
+
+def test_invalid_tournaments_and_results():
+    with pytest.raises(TournamentError):
+        DoubleEliminationTournament(entrants(1))
+    with pytest.raises(TournamentError):
+        DoubleEliminationTournament(entrants(2) + entrants(1))
+
+    tournament = DoubleEliminationTournament(entrants(3))
+    with pytest.raises(TournamentError):
+        tournament.record_result("e2")
+    play(tournament, lambda matchup: matchup[0])
+    with pytest.raises(TournamentError):
+        tournament.record_result("e2")
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().chartsdemo
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def test_stale_result_version_is_a_409(mock_db):
+    async def run():
+        now = datetime.utcnow()
+        await mock_db.tournaments.insert_one({
+            "_id": "s1", "state": DoubleEliminationTournament(entrants(3)).to_dict(),
+            "version": 0, "created_at": now, "updated_at": now,
+        })
+
+        first = await server.record_tournament_result("s1", server.TournamentResult(winner_id="e0", version=0))
+        assert first["version"] == 1
+
+        # A double-click sends the same result for the version it was served
+        with pytest.raises(server.HTTPException) as error:
+            await server.record_tournament_result("s1", server.TournamentResult(winner_id="e0", version=0))
+        assert error.value.status_code == 409
+
+        stored = await mock_db.tournaments.find_one({"_id": "s1"})
+        assert stored["version"] == 1
+        assert stored["state"]["matches_played"] == 1
+
+        with pytest.raises(server.HTTPException) as error:
+            await server.record_tournament_result("missing", server.TournamentResult(winner_id="e0"))
+        assert error.value.status_code == 404
+
+    asyncio.run(run())
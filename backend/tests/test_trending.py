@@ -0,0 +1,48 @@
+import asyncio
+
+import server
+
+
+def make_pair(symbol, pair_address, token, volume, quote="USDT"):
+    return {
+        "chainId": "solana",
+        "pairAddress": pair_address,
+        "baseToken": {"address": token, "symbol": symbol},
+        "quoteToken": {"symbol": quote},
+        "volume": {"h24": volume},
+    }
+
+
+def fake_dexscreener(boosted_pairs, search_pairs, searched):
+    async def fetch(path, timeout=None, params=None):
+        if path.startswith("/token-boosts/"):
+            return [{"chainId": "solana", "tokenAddress": pair["baseToken"]["address"]} for pair in boosted_pairs]
+        if path.startswith("/tokens/v1/"):
+            return boosted_pairs
+        searched.append(params["q"])
+        return {"pairs": search_pairs.get(params["q"], [])}
+    return fetch
+
+
+def test_boosted_clone_does_not_hide_the_searched_token(monkeypatch):
+    # A low-volume boosted clone reusing the PUMP ticker, and the real PUMP token
+    clone = make_pair("PUMP", "clone_pair", "CloneToken", 500)
+    real = make_pair("PUMP", "real_pair", "RealToken", 5_000_000)
+    searched = []
+    monkeypatch.setattr(server, "fetch_dexscreener", fake_dexscreener([clone], {"PUMP": [real]}, searched))
+
+    charts = asyncio.run(server.build_trending_charts())
+
+    assert sorted(searched) == sorted(server.TRENDING_SEARCHES)
+    assert [chart["pairAddress"] for chart in charts] == ["real_pair", "clone_pair"]
+
+
+def test_searched_token_already_boosted_is_not_added_twice(monkeypatch):
+    boosted = make_pair("WIF", "wif_boosted", "WifToken", 200_000)
+    # The search finds the same token through another pair
+    searched_pair = make_pair("WIF", "wif_other", "wiftoken", 900_000)
+    monkeypatch.setattr(server, "fetch_dexscreener", fake_dexscreener([boosted], {"WIF": [searched_pair]}, []))
+
+    charts = asyncio.run(server.build_trending_charts())
+
+    assert [chart["pairAddress"] for chart in charts] == ["wif_boosted"]
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from write_buffer import BufferFull, WriteBuffer
+
+
+class FlakyFlush:
+    """flush_fn failing its first `failures` calls, recording every batch it was given"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+        self.written = []
+
+    async def __call__(self, batch, progress):
+        self.calls.append((list(batch), progress))
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("MongoDB unreachable")
+        self.written.extend(batch)
+
+
+def test_batches_flush_at_max_size():
+    flush = FlakyFlush()
+    buffer = WriteBuffer(flush, max_size=3, interval=60, max_pending=100, max_attempts=3)
+
+    async def run():
+        await buffer.add([1, 2])
+        assert flush.written == []
+        await buffer.add([3])
+
+    asyncio.run(run())
+    assert flush.written == [1, 2, 3]
+    assert (buffer.flushed_docs, buffer.flushed_batches, len(buffer)) == (3, 1, 0)
+
+
+def test_failed_batch_is_retried_first_with_the_same_progress():
+    flush = FlakyFlush(failures=1)
+    buffer = WriteBuffer(flush, max_size=100, interval=60, max_pending=100, max_attempts=3)
+
+    async def run():
+        await buffer.add([1, 2])
+        await buffer.flush()
+        assert len(buffer) == 2
+        await buffer.add([3])
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert flush.written == [1, 2, 3]
+    assert [batch for batch, _ in flush.calls] == [[1, 2], [1, 2], [3]]
+    # The retry gets the progress set of the attempt that failed, a new batch a new one
+    assert flush.calls[0][1] is flush.calls[1][1]
+    assert flush.calls[2][1] is not flush.calls[0][1]
+    assert (buffer.failed_flushes, buffer.dropped_docs, len(buffer)) == (1, 0, 0)
+
+
+def test_newer_batches_wait_while_a_parked_batch_keeps_failing():
+    flush = FlakyFlush(failures=2)
+    buffer = WriteBuffer(flush, max_size=100, interval=60, max_pending=100, max_attempts=5)
+
+    async def run():
+        await buffer.add([1])
+        await buffer.flush()
+        await buffer.add([2])
+        await buffer.flush()
+        assert len(buffer) == 2
+        await buffer.flush()
+
+    asyncio.run(run())
+    # [2] is not attempted while [1] is still failing, so writes stay in order
+    assert [batch for batch, _ in flush.calls] == [[1], [1], [1], [2]]
+    assert flush.written == [1, 2]
+
+
+def test_batch_is_dropped_after_max_attempts():
+    flush = FlakyFlush(failures=3)
+    buffer = WriteBuffer(flush, max_size=100, interval=60, max_pending=100, max_attempts=3)
+
+    async def run():
+        await buffer.add([1, 2])
+        for _ in range(3):
+            await buffer.flush()
+        assert len(buffer) == 0
+        await buffer.add([3])
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert [batch for batch, _ in flush.calls] == [[1, 2], [1, 2], [1, 2], [3]]
+    assert flush.written == [3]
+    assert (buffer.failed_flushes, buffer.dropped_docs) == (3, 2)
+
+
+def test_add_refuses_writes_beyond_max_pending():
+    flush = FlakyFlush(failures=1)
+    buffer = WriteBuffer(flush, max_size=2, interval=60, max_pending=3, max_attempts=5)
+
+    async def run():
+        await buffer.add([1, 2])  # flushed, fails and is parked
+        await buffer.add([3])
+        with pytest.raises(BufferFull):
+            await buffer.add([4])
+        # Parked writes count towards max_pending until they go through
+        await buffer.flush()
+        await buffer.add([4, 5])
+
+    asyncio.run(run())
+    assert flush.written == [1, 2, 3, 4, 5]
+    assert len(buffer) == 0
+
+
+def test_stop_flushes_what_is_left():
+    flush = FlakyFlush()
+    buffer = WriteBuffer(flush, max_size=100, interval=60, max_pending=100, max_attempts=3)
+
+    async def run():
+        buffer.start()
+        await buffer.add([1, 2])
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert flush.written == [1, 2]
@@ -0,0 +1,136 @@
+"""Double-elimination tournament used for Step 3 of the analysis flow.
+
+Brackets are FIFO queues: every match takes the two entrants at the front of
+the active bracket, the winner rejoins at the back and the loser drops to the
+losers bracket (or out, if it already lost once). Recording a result and
+picking the next matchup are O(1), and the whole state round-trips through
+to_dict()/from_dict() so it can be persisted between matches.
+"""
+
+from collections import deque
+from typing import List, Optional
+
+
+class TournamentError(ValueError):
+    """Raised for results that don't match the current state of the tournament"""
+
+
+class DoubleEliminationTournament:
+    WINNERS = "winners"
+    LOSERS = "losers"
+    GRAND_FINALS = "grandfinals"
+    FINISHED = "finished"
+
+    def __init__(self, entrants: List[dict]):
+        """entrants: dicts with a unique "id"; any other keys are carried along untouched"""
+        if len(entrants) < 2:
+            raise TournamentError("A tournament needs at least 2 entrants")
+        self.entrants = {entrant["id"]: entrant for entrant in entrants}
+        if len(self.entrants) != len(entrants):
+            raise TournamentError("Entrant ids must be unique")
+        self.winners = deque(entrant["id"] for entrant in entrants)
+        self.losers = deque()
+        self.eliminated = []
+        self.losses = {entrant_id: 0 for entrant_id in self.entrants}
+        self.phase = self.WINNERS
+        self.matchup = None
+        self.rankings = []
+        self.matches_played = 0
+        self._next_matchup()
+
+    @property
+    def finished(self) -> bool:
+        return self.phase == self.FINISHED
+
+    def _next_matchup(self):
+        if self.phase == self.WINNERS and len(self.winners) == 1:
+            self.phase = self.LOSERS
+        if self.phase == self.LOSERS and len(self.losers) == 1:
+            self.phase = self.GRAND_FINALS
+
+        if self.phase == self.WINNERS:
+            self.matchup = (self.winners[0], self.winners[1])
+        elif self.phase == self.LOSERS:
+            self.matchup = (self.losers[0], self.losers[1])
+        elif self.phase == self.GRAND_FINALS:
+            self.matchup = (self.winners[0], self.losers[0])
+
+    def _finish(self, first: str, second: str):
+        third = self.eliminated[-1] if self.eliminated else None
+        self.rankings = [entrant_id for entrant_id in (first, second, third) if entrant_id is not None]
+        self.phase = self.FINISHED
+        self.matchup = None
+
+    def record_result(self, winner_id: str):
+        if self.finished:
+            raise TournamentError("Tournament is already finished")
+        if winner_id not in self.matchup:
+            raise TournamentError(f"{winner_id} is not in the current matchup")
+        left, right = self.matchup
+        loser_id = right if winner_id == left else left
+        self.losses[loser_id] += 1
+        self.matches_played += 1
+
+        if self.phase == self.WINNERS:
+            self.winners.popleft()
+            self.winners.popleft()
+            self.winners.append(winner_id)
+            self.losers.append(loser_id)
+        elif self.phase == self.LOSERS:
+            self.losers.popleft()
+            self.losers.popleft()
+            self.losers.append(winner_id)
+            self.eliminated.append(loser_id)
+        else:
+            champion = self.winners[0]
+            if winner_id == champion or self.losses[champion] > 1:
+                # Winners champion won, or lost the bracket reset as well
+                self._finish(winner_id, loser_id)
+                return
+            # Winners champion's first loss - play the reset match with the same pair
+
+        self._next_matchup()
+
+    def entrant(self, entrant_id: Optional[str]) -> Optional[dict]:
+        return self.entrants.get(entrant_id) if entrant_id is not None else None
+
+    def view(self) -> dict:
+        """Client-facing state: current matchup, progress and final top 3"""
+        left, right = self.matchup or (None, None)
+        return {
+            "phase": self.phase,
+            "finished": self.finished,
+            "matchup": None if self.finished else {"left": self.entrant(left), "right": self.entrant(right)},
+            "winners_remaining": len(self.winners),
+            "losers_remaining": len(self.losers),
+            "eliminated": len(self.eliminated),
+            "matches_played": self.matches_played,
+            "rankings": [self.entrant(entrant_id) for entrant_id in self.rankings],
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "entrants": list(self.entrants.values()),
+            "winners": list(self.winners),
+            "losers": list(self.losers),
+            "eliminated": self.eliminated,
+            "losses": self.losses,
+            "phase": self.phase,
+            "matchup": list(self.matchup) if self.matchup else None,
+            "rankings": self.rankings,
+            "matches_played": self.matches_played,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "DoubleEliminationTournament":
+        tournament = cls.__new__(cls)
+        tournament.entrants = {entrant["id"]: entrant for entrant in state["entrants"]}
+        tournament.winners = deque(state["winners"])
+        tournament.losers = deque(state["losers"])
+        tournament.eliminated = list(state["eliminated"])
+        tournament.losses = dict(state["losses"])
+        tournament.phase = state["phase"]
+        tournament.matchup = tuple(state["matchup"]) if state["matchup"] else None
+        tournament.rankings = list(state["rankings"])
+        tournament.matches_played = state["matches_played"]
+        return tournament
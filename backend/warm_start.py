@@ -0,0 +1,55 @@
+"""Warm-start persistence: the last trending snapshot and the symbol -> pair
+resolutions are saved to MongoDB and loaded on startup, so a fresh process
+serves its first request without a cold Dexscreener aggregation."""
+
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from pymongo import ReplaceOne
+
+
+class WarmStartStore:
+    """Snapshots live in one collection keyed by name, resolutions in another
+    (TTL-indexed on expires_at, so expired pairs disappear on their own)."""
+
+    def __init__(self, snapshots, symbol_pairs):
+        self.snapshots = snapshots
+        self.symbol_pairs = symbol_pairs
+
+    async def save_snapshot(self, name: str, value, age: float = 0.0):
+        await self.snapshots.replace_one(
+            {"_id": name},
+            {"value": value, "saved_at": datetime.utcnow() - timedelta(seconds=age)},
+            upsert=True,
+        )
+
+    async def load_snapshot(self, name: str, max_age: float) -> Optional[Tuple[object, float]]:
+        """Return (value, age_seconds), or None when there is no snapshot younger than max_age"""
+        doc = await self.snapshots.find_one({"_id": name})
+        if doc is None or not doc.get("value"):
+            return None
+        age = max(0.0, (datetime.utcnow() - doc["saved_at"]).total_seconds())
+        if age > max_age:
+            return None
+        return doc["value"], age
+
+    async def save_symbol_pairs(self, entries: List[Tuple[str, dict, float]]):
+        """entries are (symbol, pair, remaining_ttl_seconds)"""
+        if not entries:
+            return
+        now = datetime.utcnow()
+        await self.symbol_pairs.bulk_write([
+            ReplaceOne(
+                {"_id": symbol},
+                {"pair": pair, "expires_at": now + timedelta(seconds=ttl)},
+                upsert=True,
+            )
+            for symbol, pair, ttl in entries
+        ], ordered=False)
+
+    async def load_symbol_pairs(self) -> List[Tuple[str, dict, float]]:
+        now = datetime.utcnow()
+        entries = []
+        async for doc in self.symbol_pairs.find({"expires_at": {"$gt": now}}):
+            entries.append((doc["_id"], doc["pair"], (doc["expires_at"] - now).total_seconds()))
+        return entries
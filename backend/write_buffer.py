@@ -0,0 +1,109 @@
+"""Batches small writes so the database sees a few large inserts instead of many tiny ones"""
+
+from collections import deque
+from typing import Awaitable, Callable, List, Optional, Set
+import asyncio
+
+
+class BufferFull(RuntimeError):
+    """Raised by WriteBuffer.add when accepting the documents would exceed max_pending"""
+
+
+class WriteBuffer:
+    """Collects documents and hands them to flush_fn in batches.
+
+    A batch is flushed as soon as max_size documents are waiting, or every
+    interval seconds otherwise. stop() flushes whatever is left, so nothing
+    queued before shutdown is lost.
+
+    flush_fn(batch, progress) gets a set it may record finished steps in. A
+    failed batch is parked and retried on its own with the same set, so a
+    retry can skip the steps that already went through; after max_attempts
+    failures it is dropped. While max_pending documents are waiting, add()
+    raises BufferFull instead of queueing more."""
+
+    def __init__(self, flush_fn: Callable[[List[dict], Set], Awaitable[None]], max_size: int, interval: float,
+                 max_pending: int, max_attempts: int):
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending: List[dict] = []
+        self._failed = deque()  # [batch, progress, attempts] of parked batches, oldest first
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_docs = 0
+        self.flushed_batches = 0
+        self.failed_flushes = 0
+        self.dropped_docs = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._failed:
+            print(f"Discarding {sum(len(batch) for batch, _, _ in self._failed)} buffered writes that could not be flushed")
+
+    async def add(self, docs: List[dict]):
+        if len(self) + len(docs) > self.max_pending:
+            raise BufferFull(f"{len(self)} writes already waiting")
+        self._pending.extend(docs)
+        if len(self._pending) >= self.max_size:
+            await self.flush()
+
+    async def _attempt(self, entry: list) -> bool:
+        batch, progress, _ = entry
+        try:
+            await self.flush_fn(batch, progress)
+        except Exception as e:
+            entry[2] += 1
+            self.failed_flushes += 1
+            print(f"Failed to flush {len(batch)} buffered writes (attempt {entry[2]}): {e}")
+            return False
+        self.flushed_docs += len(batch)
+        self.flushed_batches += 1
+        return True
+
+    async def flush(self):
+        async with self._lock:
+            # Parked batches first, in order; while they still fail the database is likely down
+            while self._failed:
+                entry = self._failed[0]
+                if await self._attempt(entry):
+                    self._failed.popleft()
+                elif entry[2] >= self.max_attempts:
+                    self._failed.popleft()
+                    self._drop(entry)
+                else:
+                    return
+            if not self._pending:
+                return
+            entry = [self._pending, set(), 0]
+            self._pending = []
+            if not await self._attempt(entry):
+                if entry[2] >= self.max_attempts:
+                    self._drop(entry)
+                else:
+                    self._failed.append(entry)
+
+    def _drop(self, entry: list):
+        self.dropped_docs += len(entry[0])
+        print(f"Dropping {len(entry[0])} buffered writes after {entry[2]} failed attempts")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def __len__(self):
+        return len(self._pending) + sum(len(batch) for batch, _, _ in self._failed)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Local Dexscreener stand-in for benchmarks.
+
+Serves the three endpoints the backend uses with deterministic, realistically
+sized pair objects, after a configurable latency and with a configurable
+error rate:
+
+    python bench/mock_dexscreener.py --port 9100 --latency-ms 150 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+
+from fastapi import FastAPI, Response
+import uvicorn
+
+CHAINS = ["solana", "ethereum", "base", "bsc"]
+QUOTES = ["USDT", "USDC", "SOL", "WETH"]
+
+app = FastAPI(title="Mock Dexscreener")
+config = {"latency_ms": 100.0, "jitter_ms": 20.0, "error_rate": 0.0, "pairs_per_search": 30}
+stats = {"requests": 0, "errors": 0}
+
+
+def seeded(key: str) -> random.Random:
+    """Same key, same data - so runs are comparable across commits"""
+    return random.Random(int(hashlib.sha1(key.encode()).hexdigest()[:12], 16))
+
+
+def make_pair(symbol: str, token_address: str, index: int, chain_id: str = None) -> dict:
+    rng = seeded(f"{token_address}:{index}")
+    chain_id = chain_id or rng.choice(CHAINS)
+    pair_address = hashlib.sha1(f"pair:{token_address}:{index}".encode()).hexdigest()
+    return {
+        "chainId": chain_id,
+        "dexId": rng.choice(["raydium", "uniswap", "orca", "pancakeswap"]),
+        "url": f"https://dexscreener.com/{chain_id}/{pair_address}",
+        "pairAddress": pair_address,
+        "labels": ["v2"],
+        "baseToken": {"address": token_address, "name": f"{symbol} Token", "symbol": symbol},
+        "quoteToken": {"address": f"quote_{index % len(QUOTES)}", "name": QUOTES[index % len(QUOTES)], "symbol": QUOTES[index % len(QUOTES)]},
+        "priceNative": f"{rng.random():.8f}",
+        "priceUsd": f"{rng.random() * 10:.6f}",
+        "txns": {window: {"buys": rng.randint(0, 5000), "sells": rng.randint(0, 5000)} for window in ("m5", "h1", "h6", "h24")},
+        "volume": {window: round(rng.random() * 10 ** rng.randint(3, 7), 2) for window in ("h24", "h6", "h1", "m5")},
+        "priceChange": {window: round(rng.uniform(-30, 30), 2) for window in ("m5", "h1", "h6", "h24")},
+        "liquidity": {"usd": round(rng.random() * 1e6, 2), "base": rng.randint(1, 10 ** 9), "quote": round(rng.random() * 1e6, 2)},
+        "fdv": rng.randint(10 ** 4, 10 ** 10),
+        "marketCap": rng.randint(10 ** 4, 10 ** 10),
+        "pairCreatedAt": 1700000000000 + rng.randint(0, 10 ** 10),
+        "info": {
+            "imageUrl": f"https://dd.dexscreener.com/ds-data/tokens/{chain_id}/{token_address}.png",
+            "websites": [{"label": "Website", "url": f"https://{symbol.lower()}.example"}],
+            "socials": [{"type": "twitter", "url": f"https://x.com/{symbol.lower()}"}],
+        },
+    }
+
+
+async def upstream_delay():
+    """Simulated network latency, then maybe a failure; returns an error response or None"""
+    stats["requests"] += 1
+    delay = max(0.0, random.gauss(config["latency_ms"], config["jitter_ms"])) / 1000
+    await asyncio.sleep(delay)
+    if random.random() < config["error_rate"]:
+        stats["errors"] += 1
+        return Response(status_code=random.choice([429, 500, 503]))
+    return None
+
+
+@app.get("/token-boosts/latest/v1")
+async def token_boosts():
+    error = await upstream_delay()
+    if error:
+        return error
+    return [
+        {"chainId": CHAINS[i % len(CHAINS)], "tokenAddress": hashlib.sha1(f"boost:{i}".encode()).hexdigest(), "amount": 100 - i}
+        for i in range(30)
+    ]
+
+
+@app.get("/tokens/v1/{chain_id}/{token_addresses}")
+async def tokens(chain_id: str, token_addresses: str):
+    error = await upstream_delay()
+    if error:
+        return error
+    pairs = []
+    for address in token_addresses.split(",")[:30]:
+        symbol = f"B{address[:4].upper()}"
+        pairs.extend(make_pair(symbol, address, index, chain_id) for index in range(3))
+    return pairs
+
+
+@app.get("/latest/dex/search")
+async def search(q: str):
+    error = await upstream_delay()
+    if error:
+        return error
+    symbol = q.upper()
+    token_address = hashlib.sha1(f"token:{symbol}".encode()).hexdigest()
+    return {"schemaVersion": "1.0.0", "pairs": [make_pair(symbol, token_address, index) for index in range(config["pairs_per_search"])]}
+
+
+@app.get("/_stats")
+async def get_stats():
+    return {**stats, **config}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--pairs-per-search", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=99)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    config.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        pairs_per_search=args.pairs_per_search,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the Charts Demo API.
+
+Starts the mock Dexscreener (bench/mock_dexscreener.py) and the backend with
+uvicorn, pointed at a local MongoDB, then drives each endpoint with
+concurrent clients and reports throughput and p50/p95/p99 latency.
+
+Results are written as JSON tagged with the current commit; pass a previous
+result file with --compare to flag regressions (exit code 1):
+
+    python bench/run_bench.py --output bench_results.json
+    python bench/run_bench.py --compare bench_results.json --max-regression 0.15
+
+Use --start-mongod to run a throwaway mongod instead of an existing server.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT, "backend")
+MOCK_SERVER = os.path.join(ROOT, "bench", "mock_dexscreener.py")
+
+TICKERS = [
+    "WIFUSDT", "BONKUSDT", "PEPEUSDT", "SHIBUSDT", "DOGEUSDT", "FLOKIUSDT", "POPCATUSDT", "GOATUSDT",
+    "PNUTUSDT", "SPXUSDT", "TURBOUSDT", "MOODENGUSDT", "ACTUSDT", "VIRTUALUSDT", "ZEREBROUSDT", "MEMEUSDT",
+    "ALTUSDT", "PUMPUSDT", "IPOUSDT", "POWELLUSDT", "MAGAUSDT", "FREDUSDT", "CHILLGUYUSDT", "BTCUSDT",
+    "ETHUSDT", "SOLUSDT", "LINKUSDT", "UNIUSDT", "AVAXUSDT", "ARBUSDT", "OPUSDT", "JUPUSDT",
+]
+SESSIONS = [f"bench-session-{i}" for i in range(100)]
+
+
+def choice_payload(i: int) -> dict:
+    return {
+        "session_id": SESSIONS[i % len(SESSIONS)],
+        "chart_index": i // len(SESSIONS),
+        "chart_data": {
+            "pairAddress": f"bench-pair-{i % 64}",
+            "chainId": "solana",
+            "symbol": TICKERS[i % len(TICKERS)][:-4],
+            "name": "Bench Token",
+            "price": "1.0",
+            "change24h": 0,
+        },
+        "choice": "green" if i % 3 else "red",
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+# name -> function(client, i) issuing one request
+SCENARIOS = {
+    "root": lambda client, i: client.get("/"),
+    "trending-charts": lambda client, i: client.get("/api/trending-charts"),
+    "trending-charts-slim": lambda client, i: client.get("/api/trending-charts", params={"slim": "true"}),
+    "get-trending-metadata": lambda client, i: client.get("/api/get-trending-metadata/bench-metadata"),
+    "resolve-tickers": lambda client, i: client.post("/api/resolve-tickers", json={"tickers": TICKERS}),
+    "record-choice": lambda client, i: client.post("/api/record-choice", json=choice_payload(i)),
+    "record-choices": lambda client, i: client.post(
+        "/api/record-choices", json={"choices": [choice_payload(i * 32 + j) for j in range(32)]}
+    ),
+    "session-results": lambda client, i: client.get(f"/api/session-results/{SESSIONS[i % len(SESSIONS)]}"),
+    "leaderboard": lambda client, i: client.get("/api/leaderboard"),
+    "candles": lambda client, i: client.get(
+        f"/api/candles/solana/bench-pair-{i % 64}", params={"interval": ("1h", "4h", "1d")[i % 3]}
+    ),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+async def run_scenario(base_url: str, name: str, requests: int, concurrency: int, warmup: int) -> dict:
+    issue = SCENARIOS[name]
+    latencies = []
+    errors = 0
+    counter = iter(range(warmup + requests))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        for i in range(warmup):
+            await issue(client, next(counter))
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await issue(client, i)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+async def wait_until_ready(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+        else:
+            raise RuntimeError(f"{base_url} did not come up within {timeout}s")
+
+        # Let the background refresher publish its first snapshot so trending runs measure steady state
+        while time.monotonic() < deadline:
+            try:
+                status = (await client.get("/api/trending-status")).json()
+                if status.get("total") or not status.get("refresher", {}).get("running"):
+                    return
+            except (httpx.HTTPError, ValueError):
+                pass
+            await asyncio.sleep(0.2)
+
+
+async def seed(base_url: str):
+    """Data the read scenarios need: stored trending metadata and recorded sessions"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        charts = (await client.get("/api/trending-charts")).json().get("charts", [])
+        await client.post("/api/store-trending-metadata", json={"session_id": "bench-metadata", "charts": charts})
+        for i in range(0, len(SESSIONS) * 32, 320):
+            await client.post("/api/record-choices", json={"choices": [choice_payload(i + j) for j in range(320)]})
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> bool:
+    """Print deltas against a previous run; True when any scenario regressed beyond the threshold"""
+    regressed = False
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        p95_delta = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0.0
+        rps_delta = (current["throughput_rps"] - previous["throughput_rps"]) / previous["throughput_rps"] if previous["throughput_rps"] else 0.0
+        flag = ""
+        if p95_delta > max_regression or rps_delta < -max_regression:
+            regressed = True
+            flag = "  <-- REGRESSION"
+        print(f"  {name:24} p95 {p95_delta:+7.1%}  throughput {rps_delta:+7.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated, default: all")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--app-port", type=int, default=8101)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="mock Dexscreener latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock Dexscreener error rate")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="chartsdemo_bench")
+    parser.add_argument("--start-mongod", action="store_true", help="run a throwaway mongod on port 27117")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="extra backend settings")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    processes = []
+    mongo_dir = None
+    try:
+        mongo_url = args.mongo_url
+        if args.start_mongod:
+            mongo_dir = tempfile.mkdtemp(prefix="bench-mongo-")
+            processes.append(subprocess.Popen(
+                ["mongod", "--dbpath", mongo_dir, "--port", "27117", "--bind_ip", "127.0.0.1", "--quiet"],
+                stdout=subprocess.DEVNULL,
+            ))
+            mongo_url = "mongodb://127.0.0.1:27117"
+
+        # Every run starts from an empty database so numbers are comparable
+        from pymongo import MongoClient
+        MongoClient(mongo_url, serverSelectionTimeoutMS=15000).drop_database(args.db_name)
+
+        processes.append(subprocess.Popen([
+            sys.executable, MOCK_SERVER, "--port", str(args.mock_port), "--latency-ms", str(args.latency_ms),
+            "--jitter-ms", str(args.jitter_ms), "--error-rate", str(args.error_rate),
+        ]))
+
+        env = dict(
+            os.environ,
+            DEXSCREENER_URL=f"http://127.0.0.1:{args.mock_port}",
+            MONGO_URL=mongo_url,
+            DB_NAME=args.db_name,
+            CANDLE_SOURCE="synthetic",
+            WEB_CONCURRENCY=str(args.workers),
+        )
+        env.update(setting.split("=", 1) for setting in args.app_env)
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.app_port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env,
+        ))
+
+        base_url = f"http://127.0.0.1:{args.app_port}"
+        asyncio.run(wait_until_ready(base_url, timeout=60))
+        asyncio.run(seed(base_url))
+
+        results = {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "config": {key: getattr(args, key) for key in ("requests", "concurrency", "workers", "latency_ms", "jitter_ms", "error_rate", "app_env")},
+            "results": {},
+        }
+        print(f"{'scenario':24} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name in scenarios:
+            stats = asyncio.run(run_scenario(base_url, name, args.requests, args.concurrency, args.warmup))
+            results["results"][name] = stats
+            print(f"{name:24} {stats['throughput_rps']:9.1f} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} {stats['errors']:7d}")
+
+        regressed = False
+        if args.compare:
+            with open(args.compare) as f:
+                regressed = compare(results, json.load(f), args.max_regression)
+
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+        sys.exit(1 if regressed else 0)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if mongo_dir:
+            shutil.rmtree(mongo_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
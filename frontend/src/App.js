@@ -138,6 +138,8 @@ function App() {
       session_id: sessionId,
       chart_index: currentIndex,
       chart_data: {
+        pairAddress: charts[currentIndex].pairAddress,
+        chainId: charts[currentIndex].chainId,
         symbol: charts[currentIndex].baseToken?.symbol || 'Unknown',
         name: charts[currentIndex].baseToken?.name || 'Unknown',
         price: charts[currentIndex].priceUsd || '0',
@@ -430,7 +432,7 @@ function App() {
 
   const showSessionResults = async () => {
     try {
-      const response = await axios.get(`${BACKEND_URL}/api/session-results/${sessionId}`);
+      const response = await axios.get(`${BACKEND_URL}/api/session-results/${sessionId}?include_choices=true&limit=500`);
       setSessionResults(response.data);
       setShowResults(true);
     } catch (error) {
@@ -503,46 +505,12 @@ function App() {
   const loadTopMarketCap = async () => {
     try {
       setLoading(true);
-      // Fetch more tokens initially to account for filtering
-      const response = await fetch('https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&order=market_cap_desc&per_page=100&page=1&sparkline=false');
-      const data = await response.json();
+      // The backend caches CoinGecko's ranking and already drops stablecoins and wrapped tokens
+      const response = await axios.get(`${BACKEND_URL}/api/top-market-cap?limit=32`);
       
-      if (data && data.length > 0) {
-        // Excluded tickers (stablecoins, wrapped tokens, etc.)
-        const excludedTickers = [
-          'USDTUSDT',
-          'USDCUSDT', 
-          'STETHUSDT',
-          'WBTCUSDT',
-          'WSTETHUSDT',
-          'LEOUSDT',
-          'WEETHUSDT',
-          'WETHUSDT',
-          'USDSUSDT',
-          'WBTUSDT',
-          'BSC-USDUSDT',
-          'CBBTCUSDT',
-          'USDEUSDT',
-          'BGBUSDT',
-          'SUSDEUSDT'
-        ];
-        
-        const newTickers = [];
-        
-        // Filter and convert coins to ticker format
-        for (const coin of data) {
-          if (newTickers.length >= 32) break;
-          
-          const ticker = `${coin.symbol.toUpperCase()}USDT`;
-          
-          // Skip if ticker is in excluded list
-          if (!excludedTickers.includes(ticker)) {
-            newTickers.push(ticker);
-          }
-        }
-        
+      if (response.data.success && response.data.tickers.length > 0) {
         // Fill remaining slots if we don't have 32
-        const finalTickers = [...newTickers];
+        const finalTickers = [...response.data.tickers];
         while (finalTickers.length < 32) {
           finalTickers.push('');
         }
@@ -688,86 +656,52 @@ function App() {
     
     console.log('Custom tickers being used:', randomizedTickers); // Debug log
     
-    // Fetch actual pair data for each ticker from Dexscreener
-    const customCharts = [];
+    // Resolve every ticker to its best USDT/USDC pair in one backend call
+    const createMockChart = (ticker) => {
+      const baseSymbol = ticker.replace(/USDT$|USDC$|SOL$|ETH$/i, '');
+      return {
+        chainId: 'ethereum',
+        pairAddress: `mock_${ticker}_${Date.now()}`,
+        baseToken: {
+          symbol: baseSymbol,
+          name: `${baseSymbol} Token`
+        },
+        priceUsd: (Math.random() * 100).toFixed(6),
+        priceChange: {
+          h24: ((Math.random() - 0.5) * 20).toFixed(2)
+        },
+        volume: {
+          h24: (Math.random() * 1000000).toFixed(0)
+        },
+        originalTicker: ticker,
+        isCustom: true,
+        isMock: true
+      };
+    };
     
-    for (const ticker of randomizedTickers) {
-      try {
-        const baseSymbol = ticker.replace(/USDT$|USDC$|SOL$|ETH$/i, '');
-        console.log(`Searching for pairs for ${baseSymbol}...`);
-        
-        // Use Dexscreener search API to find actual pairs
-        const response = await fetch(`https://api.dexscreener.com/latest/dex/search?q=${baseSymbol}`);
-        const data = await response.json();
-        
-        if (data.pairs && data.pairs.length > 0) {
-          // Filter for USDT and USDC pairs first
-          const usdtPairs = data.pairs.filter(pair => {
-            const quoteSymbol = pair.quoteToken?.symbol?.toLowerCase();
-            return quoteSymbol === 'usdt' || quoteSymbol === 'usdc';
-          });
-          
-          // If we have USDT/USDC pairs, use them; otherwise fall back to all pairs
-          const relevantPairs = usdtPairs.length > 0 ? usdtPairs : data.pairs;
-          
-          // Find the best pair (highest volume) from relevant pairs
-          const bestPair = relevantPairs.sort((a, b) => {
-            const volumeA = parseFloat(a.volume?.h24 || 0);
-            const volumeB = parseFloat(b.volume?.h24 || 0);
-            return volumeB - volumeA;
-          })[0];
-          
-          console.log(`Found pair for ${baseSymbol}: ${bestPair.baseToken?.symbol}/${bestPair.quoteToken?.symbol} on ${bestPair.chainId}`);
-          
-          customCharts.push({
-            ...bestPair,
+    let customCharts = [];
+    
+    try {
+      const response = await axios.post(`${BACKEND_URL}/api/resolve-tickers`, {
+        tickers: randomizedTickers
+      });
+      
+      customCharts = response.data.results.map(({ ticker, pair }) => {
+        if (pair) {
+          console.log(`Found pair for ${ticker}: ${pair.baseToken?.symbol}/${pair.quoteToken?.symbol} on ${pair.chainId}`);
+          return {
+            ...pair,
             originalTicker: ticker,
             isCustom: true
-          });
-        } else {
-          // Fallback: create mock data if no pairs found
-          customCharts.push({
-            chainId: 'ethereum',
-            pairAddress: `mock_${ticker}_${Date.now()}`,
-            baseToken: {
-              symbol: baseSymbol,
-              name: `${baseSymbol} Token`
-            },
-            priceUsd: (Math.random() * 100).toFixed(6),
-            priceChange: {
-              h24: ((Math.random() - 0.5) * 20).toFixed(2)
-            },
-            volume: {
-              h24: (Math.random() * 1000000).toFixed(0)
-            },
-            originalTicker: ticker,
-            isCustom: true,
-            isMock: true
-          });
+          };
         }
-      } catch (error) {
-        console.error(`Failed to fetch data for ${ticker}:`, error);
-        // Add mock data as fallback
-        const baseSymbol = ticker.replace(/USDT$|USDC$|SOL$|ETH$/i, '');
-        customCharts.push({
-          chainId: 'ethereum',
-          pairAddress: `mock_${ticker}_${Date.now()}`,
-          baseToken: {
-            symbol: baseSymbol,
-            name: `${baseSymbol} Token`
-          },
-          priceUsd: (Math.random() * 100).toFixed(6),
-          priceChange: {
-            h24: ((Math.random() - 0.5) * 20).toFixed(2)
-          },
-          volume: {
-            h24: (Math.random() * 1000000).toFixed(0)
-          },
-          originalTicker: ticker,
-          isCustom: true,
-          isMock: true
-        });
-      }
+        // Fallback: create mock data if no pairs found
+        return createMockChart(ticker);
+      });
+    } catch (error) {
+      console.error('Failed to resolve tickers:', error);
+      // Add mock data as fallback
+      customCharts = randomizedTickers.map(createMockChart);
     }
     
     console.log('Final charts data:', customCharts);